@@ -1,29 +1,33 @@
 # analytics.py
 
 import streamlit as st
-import pandas as pd
-from database import get_user_logs, delete_study_log
-from database import safe_parse_datetime
+from database import (
+    get_recent_logs,
+    delete_study_log,
+    get_log_totals,
+    get_logs_page,
+    get_subject_summary,
+    get_daily_summary,
+    get_concentration_summary,
+    get_focus_range_counts,
+)
+from db_writer import write
+from instrumentation import instrument_namespace
+
+# 메인 페이지에 표시할 최근 기록 수
+RECENT_LOGS_LIMIT = 10
 
 def render_recent_logs():
     """최근 공부 기록만 표시 (메인 페이지용)"""
+    import pandas as pd
     st.markdown("## 📊 공부 기록")
-    df = get_user_logs(st.session_state.user_id)
+    # 최근 10개 기록과 전체 개수만 조회
+    recent_df, total_count = get_recent_logs(st.session_state.user_id, limit=RECENT_LOGS_LIMIT)
     
-    if df.empty:
+    if recent_df.empty:
         st.write("아직 기록이 없습니다.")
         return
     
-    # 시간 형식 변환
-    df["start_time"] = df["start_time"].apply(safe_parse_datetime)
-    df["end_time"] = df["end_time"].apply(safe_parse_datetime)
-    
-    # 데이터 전처리
-    df = preprocess_logs(df)
-    
-    # 최근 10개 기록만 표시
-    recent_df = df.head(10)
-    
     # 표시용 데이터프레임 준비
     display_df = recent_df[["start_time", "end_time", "subject", "duration", "felt_minutes", "concentrate_rate"]].copy()
     display_df["start_time"] = display_df["start_time"].dt.strftime('%m/%d %H:%M')
@@ -88,7 +92,7 @@ def render_recent_logs():
                     # 삭제 시도 전에 정보 확인
                     st.info(f"삭제 시도: user_id={st.session_state.user_id}, log_id={selected_log_id}")
                     
-                    if delete_study_log(st.session_state.user_id, selected_log_id):
+                    if write(delete_study_log, st.session_state.user_id, selected_log_id):
                         st.success("✅ 기록이 삭제되었습니다.")
                         st.rerun()
                     else:
@@ -100,77 +104,84 @@ def render_recent_logs():
                 if st.button("❌ 취소"):
                     st.rerun()
     
-    if len(df) > 10:
-        st.info(f"💡 전체 {len(df)}개 기록 중 최근 10개만 표시됩니다. 상세 분석은 아래 탭에서 확인하세요!")
+    if total_count > RECENT_LOGS_LIMIT:
+        st.info(f"💡 전체 {total_count}개 기록 중 최근 {RECENT_LOGS_LIMIT}개만 표시됩니다. 상세 분석은 아래 탭에서 확인하세요!")
 
 def render_analytics_tabs():
     """상세 분석 탭들 렌더링"""
     st.markdown("## 📈 상세 분석")
-    df = get_user_logs(st.session_state.user_id)
+    user_id = st.session_state.user_id
+    totals = get_log_totals(user_id)
     
-    if df.empty:
+    if totals['total_sessions'] == 0:
         st.write("분석할 데이터가 없습니다.")
         return
     
-    # 데이터 전처리
-    df = preprocess_logs(df)
-    
     # 탭 생성
     tab1, tab2, tab3, tab4 = st.tabs(["📋 전체 기록", "📚 과목별 분석", "📅 날짜별 트렌드", "🎯 집중도 분석"])
     
     with tab1:
-        render_all_records(df)
+        render_all_records(user_id, totals)
     
     with tab2:
-        render_subject_analysis(df)
+        render_subject_analysis(user_id)
     
     with tab3:
-        render_daily_trend(df)
+        render_daily_trend(user_id)
     
     with tab4:
-        render_concentration_stats(df)
+        render_concentration_stats(user_id)
 
-def render_subject_analysis(df):
+def render_subject_analysis(user_id):
     """과목별 상세 분석"""
     st.subheader("과목별 총 공부 시간")
     
-    # 과목별 총 시간
-    subj_summary = df.groupby("subject")["duration"].sum().to_frame()
-    if not subj_summary.empty:
-        st.bar_chart(subj_summary)
+    # 과목별 집계 (SQL에서 요약된 행만 조회)
+    summary = get_subject_summary(user_id)
+    if not summary.empty:
+        st.bar_chart(summary["total_minutes"])
         
         # 과목별 상세 통계
         st.subheader("과목별 상세 통계")
-        subj_stats = df.groupby("subject").agg({
-            'duration': ['count', 'sum', 'mean'],
-            'concentrate_rate': 'mean'
-        }).round(2)
+        subj_stats = summary.round(2)
         subj_stats.columns = ['세션 수', '총 시간(분)', '평균 시간(분)', '평균 집중도(%)']
         st.dataframe(subj_stats, use_container_width=True)
     else:
         st.write("과목별 데이터가 없습니다.")
 
-def preprocess_logs(df):
-    """로그 데이터 전처리"""
-    # 원본 DataFrame을 수정하지 않도록 복사본 생성
-    df = df.copy()
-    df["start_time"] = pd.to_datetime(df["start_time"])
-    df["end_time"] = pd.to_datetime(df["end_time"])
-    df["duration"] = (df["end_time"] - df["start_time"]).dt.total_seconds() / 60
-    return df
+# 전체 기록 표의 페이지당 행 수
+RECORDS_PAGE_SIZE = 50
 
-def render_all_records(df):
-    """전체 기록 표시"""
+def render_all_records(user_id, totals):
+    """전체 기록 표시 (키셋 페이지네이션)"""
     st.subheader("전체 공부 기록")
-    display_df = df[["start_time", "end_time", "subject", "duration", "felt_minutes", "concentrate_rate"]].copy()
-    display_df = display_df.sort_values(by="start_time", ascending=False)
+    
+    # 지금까지 지나온 페이지들의 시작 커서 (첫 페이지는 None)
+    if "records_cursors" not in st.session_state:
+        st.session_state.records_cursors = [None]
+    cursors = st.session_state.records_cursors
+    
+    page_df, next_cursor = get_logs_page(user_id, before=cursors[-1], limit=RECORDS_PAGE_SIZE)
+    display_df = page_df[["start_time", "end_time", "subject", "duration", "felt_minutes", "concentrate_rate"]]
     st.dataframe(display_df, use_container_width=True)
     
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("◀ 이전", disabled=len(cursors) == 1, key="records_prev"):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"{len(cursors)} 페이지 (페이지당 {RECORDS_PAGE_SIZE}개)")
+    with col_next:
+        if st.button("다음 ▶", disabled=next_cursor is None, key="records_next"):
+            cursors.append(next_cursor)
+            st.rerun()
+    
     # 전체 통계 요약
-    total_sessions = len(df)
-    total_time = df['duration'].sum()
-    avg_session = df['duration'].mean()
-    avg_focus = df['concentrate_rate'].mean()
+    total_sessions = totals['total_sessions']
+    total_time = totals['total_minutes']
+    avg_session = totals['avg_minutes'] or 0
+    avg_focus = totals['avg_concentration'] or 0
     
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -182,13 +193,13 @@ def render_all_records(df):
     with col4:
         st.metric("평균 집중도", f"{avg_focus:.1f}%")
 
-def render_daily_trend(df):
+def render_daily_trend(user_id):
     """날짜별 공부 시간 트렌드 차트"""
     st.subheader("날짜별 공부 시간 트렌드")
-    df["date"] = df["start_time"].dt.date
-    daily = df.groupby("date").agg({
-        'duration': ['sum', 'count']
-    }).rename(columns={'duration': '총 공부시간(분)', 'count': '세션 수'})
+    daily = get_daily_summary(user_id).rename(columns={
+        'total_minutes': '총 공부시간(분)',
+        'session_count': '세션 수'
+    })
     
     if not daily.empty:
         st.line_chart(daily['총 공부시간(분)'])
@@ -198,16 +209,15 @@ def render_daily_trend(df):
     else:
         st.write("날짜별 데이터가 없습니다.")
 
-def render_concentration_stats(df):
+def render_concentration_stats(user_id):
     """과목별 집중도 통계"""
     st.subheader("집중도 분석")
     
-    if not df.empty:
+    focus_stats = get_concentration_summary(user_id)
+    if not focus_stats.empty:
         # 과목별 집중도 통계
         st.subheader("과목별 집중도 통계 (%)")
-        focus_stats = df.groupby("subject")["concentrate_rate"] \
-                        .agg(["count", "mean", "std", "min", "max"]) \
-                        .rename(columns={
+        focus_stats = focus_stats.rename(columns={
                             "count": "세션 수",
                             "mean": "평균 집중도(%)", 
                             "std": "집중도 편차", 
@@ -218,10 +228,10 @@ def render_concentration_stats(df):
         
         # 집중도 구간별 분석
         st.subheader("집중도 구간별 분석")
-        df['focus_range'] = pd.cut(df['concentrate_rate'], 
-                                  bins=[0, 50, 70, 85, 100], 
-                                  labels=['낮음(0-50%)', '보통(50-70%)', '좋음(70-85%)', '매우좋음(85-100%)'])
-        focus_range_stats = df['focus_range'].value_counts()
+        focus_range_stats = get_focus_range_counts(user_id)
         st.bar_chart(focus_range_stats)
     else:
-        st.write("집중도 데이터가 없습니다.") 
\ No newline at end of file
+        st.write("집중도 데이터가 없습니다.")
+
+# 측정이 켜져 있으면 화면 그리는 함수의 호출 시간 기록
+instrument_namespace(globals(), only_prefix="render_")
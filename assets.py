@@ -0,0 +1,75 @@
+# assets.py
+
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import namedtuple
+# PIL은 이미지를 처음 만들 때 import (로그인 화면에서는 불러오지 않음)
+
+TIER_IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tier")
+
+# 미리 만들어 둘 크기 (긴 변 기준 px)
+PROFILE_SIZE = 80        # 메인 화면 사용자 정보
+LEADERBOARD_SIZE = 32    # 리더보드 표의 아이콘
+PRESET_SIZES = (PROFILE_SIZE, LEADERBOARD_SIZE)
+
+# data: PNG 바이트, digest: 내용 해시 (같은 이미지면 같은 값이므로 캐시 키로 사용)
+ImageAsset = namedtuple("ImageAsset", ["data", "digest", "width", "height"])
+
+_assets = {}        # (파일 이름, 크기) -> ImageAsset
+_data_uris = {}     # digest -> data URI
+_lock = threading.Lock()
+
+def _encode(image, size):
+    """긴 변이 size px이 되도록 줄여 PNG 바이트로 변환"""
+    from PIL import Image
+    resized = image.copy()
+    resized.thumbnail((size, size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    resized.save(buffer, format="PNG", optimize=True)
+    data = buffer.getvalue()
+    return ImageAsset(data, hashlib.sha256(data).hexdigest()[:16], resized.width, resized.height)
+
+def _load(filename, sizes):
+    """원본을 한 번 읽어 요청한 크기들을 모두 만들어 둠 (없는 파일이면 아무것도 하지 않음)"""
+    path = os.path.join(TIER_IMAGE_DIR, filename)
+    if not os.path.exists(path):
+        return
+    from PIL import Image
+    with Image.open(path) as image:
+        image.load()
+        for size in sizes:
+            if (filename, size) not in _assets:
+                _assets[(filename, size)] = _encode(image, size)
+
+def tier_image(filename, size=PROFILE_SIZE):
+    """티어 이미지 (없는 파일이면 None)
+    원본은 처음 요청될 때 한 번만 읽고 기본 크기들을 함께 만들어 프로세스가 끝날 때까지 보관
+    """
+    key = (filename, size)
+    asset = _assets.get(key)
+    if asset is None:
+        with _lock:
+            if key not in _assets:
+                _load(filename, set(PRESET_SIZES) | {size})
+            asset = _assets.get(key)
+    return asset
+
+def preload():
+    """모든 티어 이미지를 기본 크기로 미리 만들어 둠"""
+    for filename in sorted(os.listdir(TIER_IMAGE_DIR)):
+        if filename.endswith(".png"):
+            tier_image(filename)
+
+def tier_image_uri(filename, size=LEADERBOARD_SIZE):
+    """표 안에 넣을 수 있는 data URI (해시별로 한 번만 인코딩)"""
+    asset = tier_image(filename, size)
+    if asset is None:
+        return None
+    uri = _data_uris.get(asset.digest)
+    if uri is None:
+        uri = "data:image/png;base64," + base64.b64encode(asset.data).decode("ascii")
+        _data_uris[asset.digest] = uri
+    return uri
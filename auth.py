@@ -1,13 +1,33 @@
 # auth.py
 
+import os
+import time
 import streamlit as st
-from database import get_user_by_credentials, create_user
+from datetime import datetime, timedelta
+from database import (
+    get_user,
+    get_login_user,
+    update_password_hash,
+    create_user,
+    revoke_sessions,
+    user_state_version,
+)
+from db_writer import write
+from passwords import check_password, make_password_hash, LoginBusyError
+from session_token import issue_token, verify_token, TOKEN_MAX_AGE
 from tier_logic import Tier
 import extra_streamlit_components as stx
 
 # 전역 쿠키 매니저
 cookie_manager = stx.CookieManager()
 
+# 로그인 토큰을 담는 쿠키
+SESSION_COOKIE = "session_token"
+
+# 로그인 정보 스냅샷을 DB 확인 없이 믿는 시간 (초)
+# 지나면 state_version만 다시 읽고, 그대로면 다시 이 시간만큼 연장
+USER_SNAPSHOT_TTL = float(os.environ.get("STUDY_USER_SNAPSHOT_TTL", "30"))
+
 def init_session_state():
     """세션 상태 초기화"""
     if "initialized" not in st.session_state:
@@ -17,22 +37,65 @@ def init_session_state():
         st.session_state.tier_index = 0
         st.session_state.rank_point = 0
         st.session_state.start_time = None
-        st.session_state.today_flag = False
         st.session_state.current_subject = ""
 
+def _store_user(user, token):
+    """사용자 정보를 세션에 저장하고 스냅샷 기록 (user[5]: 함께 읽은 state_version, checked_at: 마지막 확인 시각)"""
+    st.session_state.user_id = user[0]
+    st.session_state.username = user[1]
+    st.session_state.tier_index = user[2]
+    st.session_state.rank_point = user[3]
+    st.session_state.auth_snapshot = {
+        'token': token,
+        'user_id': user[0],
+        'version': user[5],
+        'checked_at': time.monotonic()
+    }
+
 def is_logged_in():
-    """로그인 여부 확인"""
-    user_id = cookie_manager.get('user_id')
-    if user_id:
-        # 쿠키에 있는 user_id로 사용자 정보 가져오기
-        user = get_user_by_credentials(None, None, user_id=int(user_id))
-        if user:
-            st.session_state.user_id = user[0]
-            st.session_state.username = user[1]
-            st.session_state.tier_index = user[2]
-            st.session_state.rank_point = user[3]
+    """로그인 여부 확인
+    쿠키의 토큰이 스냅샷과 같으면 USER_SNAPSHOT_TTL 동안은 DB를 읽지 않음
+    지나면 DB의 state_version만 확인하고, 그대로면 스냅샷을 연장
+    (티어 정산이나 로그아웃은 어느 워커 프로세스에서 일어나도 state_version을 올리므로 늦어도 TTL 뒤에는 반영)
+    """
+    token = cookie_manager.get(SESSION_COOKIE)
+    if not token:
+        return False
+
+    snapshot = st.session_state.get('auth_snapshot')
+    if snapshot and snapshot['token'] == token:
+        now = time.monotonic()
+        if now - snapshot['checked_at'] < USER_SNAPSHOT_TTL:
             return True
-    return False
+        if snapshot['version'] == user_state_version(snapshot['user_id']):
+            snapshot['checked_at'] = now
+            return True
+
+    claims = verify_token(token)
+    if claims is None:
+        return False
+    user_id, epoch = claims
+    user = get_user(user_id)
+    # 로그아웃 등으로 세대가 바뀐 토큰은 거부
+    if not user or user[4] != epoch:
+        st.session_state.pop('auth_snapshot', None)
+        return False
+    _store_user(user, token)
+    return True
+
+def authenticate(username, password):
+    """
+    아이디/비밀번호 확인 (해시 계산은 해시 스레드 풀에서)
+    평문이나 예전 설정으로 저장된 비밀번호는 로그인에 성공하면 새 해시로 바꿔 저장
+    return: (id, username, tier_index, rank_point, session_epoch, state_version), 틀리면 None
+    """
+    row = get_login_user(username)
+    ok, new_hash = check_password(password, row[6] if row else None)
+    if not ok:
+        return None
+    if new_hash:
+        write(update_password_hash, row[0], row[6], new_hash)
+    return row[:6]
 
 def render_login_signup():
     """로그인/회원가입 UI 렌더링"""
@@ -42,16 +105,18 @@ def render_login_signup():
         username_input = st.text_input("아이디")
         password_input = st.text_input("비밀번호", type="password")
         if st.button("로그인"):
-            user = get_user_by_credentials(username_input, password_input)
+            try:
+                user = authenticate(username_input, password_input)
+            except LoginBusyError as e:
+                st.warning(f"⏳ {e}")
+                st.stop()
             if user:
-                # 로그인 성공 시 쿠키에 user_id 저장
-                cookie_manager.set('user_id', str(user[0]), expires_at=None)
+                # 로그인 성공 시 쿠키에 서명된 토큰 저장
+                token = issue_token(user[0], user[4])
+                cookie_manager.set(SESSION_COOKIE, token,
+                                   expires_at=datetime.now() + timedelta(seconds=TOKEN_MAX_AGE))
                 
-                st.session_state.user_id = user[0]
-                st.session_state.username = user[1]
-                st.session_state.tier_index = user[2]
-                st.session_state.rank_point = user[3]
-                st.session_state.today_flag = False
+                _store_user(user, token)
                 st.success(f"{user[1]}님, 환영합니다! (티어: {Tier[user[2]]}, 점수: {user[3]})")
                 st.rerun()
             else:
@@ -61,16 +126,25 @@ def render_login_signup():
         new_user = st.text_input("새 아이디")
         new_pass = st.text_input("새 비밀번호", type="password")
         if st.button("회원가입"):
-            if create_user(new_user, new_pass):
+            try:
+                password_hash = make_password_hash(new_pass)
+            except LoginBusyError as e:
+                st.warning(f"⏳ {e}")
+                st.stop()
+            if write(create_user, new_user, password_hash):
                 st.success("🎉 회원가입 성공! 로그인해 주세요.")
             else:
                 st.error("❌ 이미 존재하는 아이디입니다.")
 
 def logout():
-    """로그아웃 처리"""
-    cookie_manager.delete('user_id')
+    """로그아웃 처리 (이 사용자의 모든 로그인 토큰 무효화)"""
+    if st.session_state.get('user_id') is not None:
+        write(revoke_sessions, st.session_state.user_id)
+    if cookie_manager.get(SESSION_COOKIE):
+        cookie_manager.delete(SESSION_COOKIE)
     
-    for key in ["user_id", "username", "tier_index", "rank_point", "start_time", "today_flag"]:
+    for key in ["user_id", "username", "tier_index", "rank_point", "start_time", "settlement_notice_day",
+                "settlement_checked", "auth_snapshot"]:
         if key in st.session_state:
             st.session_state.pop(key)
     st.rerun()
\ No newline at end of file
@@ -0,0 +1,125 @@
+# benchmarks/bench_database.py
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import database
+import settlement
+from benchmarks.generate_data import generate
+
+def summarize(samples, peak_bytes):
+    """측정값(초) 목록을 p50/p95(ms)와 최대 메모리로 요약"""
+    ms = sorted(s * 1000 for s in samples)
+    if len(ms) >= 2:
+        cuts = statistics.quantiles(ms, n=100, method="inclusive")
+        p50, p95 = cuts[49], cuts[94]
+    else:
+        p50 = p95 = ms[0]
+    return {
+        "runs": len(ms),
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "peak_kib": round(peak_bytes / 1024, 1)
+    }
+
+def measure(func, repeat, setup=None):
+    """setup()은 측정에서 빼고 func()만 repeat번 측정, 마지막 1회는 tracemalloc으로 최대 메모리 측정"""
+    samples = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+
+    args = setup() if setup else ()
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return summarize(samples, peak)
+
+def bench_size(users, sessions_per_user, repeat, workdir):
+    """한 데이터 크기에서 각 함수 측정"""
+    path = os.path.join(workdir, f"bench_{users}x{sessions_per_user}.db")
+    user_ids = generate(path, users, sessions_per_user)
+    user_id = user_ids[0]
+    yesterday = date.today() - timedelta(days=1)
+    results = {}
+
+    results["get_user_logs"] = measure(lambda: database.get_user_logs(user_id), repeat)
+    results["get_today_total_study_time"] = measure(lambda: database.get_today_total_study_time(user_id), repeat)
+    results["get_subject_concentration_by_time"] = measure(
+        lambda: database.get_subject_concentration_by_time(user_id), repeat
+    )
+    results["get_daily_stats"] = measure(lambda: database.get_daily_stats(user_id), repeat)
+
+    def new_session():
+        start = datetime.now() - timedelta(minutes=50)
+        return (database.start_study_session(user_id, start, "수학"),)
+
+    results["finish_study_session"] = measure(
+        lambda session_id: database.finish_study_session(session_id, user_id, datetime.now(), "수학", 40),
+        repeat, setup=new_session
+    )
+
+    def unsettle():
+        with database.transaction() as conn:
+            conn.execute("DELETE FROM tier_settlements WHERE day = ?", (yesterday.isoformat(),))
+        return ()
+
+    results["settle_day (all users)"] = measure(lambda: settlement.settle_day(yesterday), repeat, setup=unsettle)
+
+    database.close_connections()
+    return {
+        "users": users,
+        "sessions_per_user": sessions_per_user,
+        "benchmarks": results
+    }
+
+def run(sizes, users, repeat, workdir=None):
+    """여러 크기로 측정해서 JSON으로 저장 가능한 dict 반환"""
+    original_path = database.DB_PATH
+    try:
+        with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+            results = [bench_size(users, sessions, repeat, tmp) for sessions in sizes]
+    finally:
+        database.DB_PATH = original_path
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "repeat": repeat,
+        "results": results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="database.py 함수별 지연 시간/메모리 측정")
+    parser.add_argument("--sizes", default="50,500,5000", help="사용자당 세션 수 목록 (쉼표 구분)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--workdir", help="임시 DB를 만들 디렉터리")
+    parser.add_argument("--output", help="결과 JSON 파일 (생략 시 표준 출력)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    report = run(sizes, args.users, args.repeat, args.workdir)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
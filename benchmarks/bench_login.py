@@ -0,0 +1,147 @@
+# benchmarks/bench_login.py
+
+import argparse
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import database
+import passwords
+import auth
+from benchmarks.generate_data import generate
+from benchmarks.bench_database import summarize
+
+def _burst(usernames, password):
+    """모든 사용자가 동시에 로그인 (한 반이 수업 시작에 함께 들어오는 상황)
+    return: (걸린 시간(초), 로그인별 시간(초) 목록, 실패 수)
+    """
+    barrier = threading.Barrier(len(usernames) + 1)
+    samples = [None] * len(usernames)
+    failures = []
+
+    def login(index, username):
+        barrier.wait()
+        start = time.perf_counter()
+        if auth.authenticate(username, password) is None:
+            failures.append(username)
+        samples[index] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=login, args=(i, name)) for i, name in enumerate(usernames)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, samples, len(failures)
+
+def _burst_result(wall, samples, failures):
+    result = summarize(samples, 0)
+    result.pop("peak_kib")
+    result["wall_s"] = round(wall, 3)
+    result["logins_per_s"] = round(len(samples) / wall, 2)
+    result["failures"] = failures
+    return result
+
+class RerunProbe:
+    """로그인이 몰리는 동안 다른 사용자의 재실행(가벼운 조회)이 얼마나 걸리는지 측정"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            database.get_user(self.user_id)
+            database.get_today_total_study_time(self.user_id)
+            self.samples.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def result(self):
+        result = summarize(self.samples, 0)
+        result.pop("peak_kib")
+        return result
+
+def bench_cost(iterations, logins, workdir):
+    """반복 횟수 하나로 첫 로그인(평문 → 해시 변환)과 이후 로그인 측정"""
+    passwords.PASSWORD_ITERATIONS = iterations
+    path = os.path.join(workdir, f"login_{iterations}.db")
+    user_ids = generate(path, logins, 1)
+    usernames = [f"bench{i}" for i in range(logins)]
+
+    start = time.perf_counter()
+    passwords.hash_password("bench")
+    single_ms = (time.perf_counter() - start) * 1000
+
+    # 다른 사용자의 재실행 시간 (로그인이 없을 때)
+    with RerunProbe(user_ids[0]) as idle:
+        time.sleep(0.5)
+
+    # generate_data의 사용자는 평문 비밀번호라 첫 로그인에서 해시로 바뀜
+    upgrade = _burst_result(*_burst(usernames, "bench"))
+    with RerunProbe(user_ids[0]) as busy:
+        hashed = _burst_result(*_burst(usernames, "bench"))
+
+    database.close_connections()
+    return {
+        "iterations": iterations,
+        "single_hash_ms": round(single_ms, 3),
+        "first_login_burst": upgrade,
+        "login_burst": hashed,
+        "rerun_idle": idle.result(),
+        "rerun_during_burst": busy.result()
+    }
+
+def run(costs, logins, workdir=None):
+    original_path = database.DB_PATH
+    original_iterations = passwords.PASSWORD_ITERATIONS
+    try:
+        with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+            results = [bench_cost(iterations, logins, tmp) for iterations in costs]
+    finally:
+        database.DB_PATH = original_path
+        passwords.PASSWORD_ITERATIONS = original_iterations
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "workers": passwords.PASSWORD_WORKERS,
+        "logins": logins,
+        "results": results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="동시 로그인 처리량과 그동안의 다른 사용자 재실행 지연 측정")
+    parser.add_argument("--iterations", default=str(passwords.PASSWORD_ITERATIONS),
+                        help="PBKDF2 반복 횟수 목록 (쉼표 구분)")
+    parser.add_argument("--logins", type=int, default=30, help="동시에 로그인하는 사용자 수")
+    parser.add_argument("--workdir", help="임시 DB를 만들 디렉터리")
+    parser.add_argument("--output", help="결과 JSON 파일 (생략 시 표준 출력)")
+    args = parser.parse_args()
+
+    costs = [int(c) for c in args.iterations.split(",")]
+    report = run(costs, args.logins, args.workdir)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
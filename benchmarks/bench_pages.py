@@ -0,0 +1,179 @@
+# benchmarks/bench_pages.py
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 측정 중에 정산 스케줄러가 DB에 쓰지 않도록 (main.py는 이 값이 1일 때만 시작)
+os.environ["STUDY_SCHEDULER"] = "0"
+
+# 페이지 스크립트 이름과 같은 모듈(analytics 등)을 먼저 불러와 두어야
+# AppTest가 pages/를 sys.path에 넣어도 pages/analytics.py로 잘못 import하지 않음
+import database
+import analytics
+import auth
+import utils
+import study_timer
+from session_token import issue_token
+from benchmarks.generate_data import generate
+from benchmarks.bench_database import summarize
+
+PAGES = [
+    "main.py",
+    "pages/analytics.py",
+    "pages/time_analysis.py",
+    "pages/subject_recommender.py",
+    "pages/leaderboard.py",
+]
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "page_thresholds.json")
+
+class StatementCounter:
+    """스레드에 관계없이 실행된 SQL 문 수 세기"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, sql):
+        with self._lock:
+            self.count += 1
+
+    def reset(self):
+        with self._lock:
+            value, self.count = self.count, 0
+        return value
+
+def login_as(user_id):
+    """쿠키 없이 로그인된 상태로 만들기 (AppTest에는 브라우저 쿠키가 없음)"""
+    epoch = database.get_user(user_id)[4]
+    token = issue_token(user_id, epoch)
+    auth.cookie_manager.get = lambda key: token if key == auth.SESSION_COOKIE else None
+
+def bench_page(page, user_id, reruns, counter):
+    """페이지 하나를 처음 실행한 뒤 reruns번 다시 실행하며 시간과 SQL 문 수 측정"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=120)
+    at.session_state["user_id"] = user_id
+
+    counter.reset()
+    start = time.perf_counter()
+    at.run()
+    first_ms = (time.perf_counter() - start) * 1000
+    first_statements = counter.reset()
+    if at.exception:
+        raise RuntimeError(f"{page}: {at.exception[0].message}")
+
+    samples, statements = [], []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - start)
+        statements.append(counter.reset())
+
+    result = summarize(samples, 0)
+    result.pop("peak_kib")
+    result["first_run_ms"] = round(first_ms, 3)
+    result["first_run_statements"] = first_statements
+    result["statements_per_rerun"] = max(statements) if statements else first_statements
+    return result
+
+def run(sizes, users, reruns, workdir=None):
+    """데이터 크기별로 모든 페이지 측정"""
+    original_path = database.DB_PATH
+    original_get = auth.cookie_manager.get
+    counter = StatementCounter()
+    os.chdir(ROOT)
+    database.set_trace_callback(counter)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+            for sessions in sizes:
+                path = os.path.join(tmp, f"pages_{users}x{sessions}.db")
+                user_id = generate(path, users, sessions)[0]
+                login_as(user_id)
+                results.append({
+                    "users": users,
+                    "sessions_per_user": sessions,
+                    "pages": {page: bench_page(page, user_id, reruns, counter) for page in PAGES}
+                })
+                database.close_connections()
+    finally:
+        database.set_trace_callback(None)
+        database.DB_PATH = original_path
+        auth.cookie_manager.get = original_get
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "reruns": reruns,
+        "results": results
+    }
+
+def check_thresholds(report, thresholds, baseline=None, max_regression=None):
+    """설정된 한도나 이전 결과 대비 허용 비율을 넘은 항목 목록"""
+    violations = []
+    previous = {}
+    if baseline:
+        for size in baseline["results"]:
+            for page, stats in size["pages"].items():
+                previous[(size["sessions_per_user"], page)] = stats
+
+    for size in report["results"]:
+        for page, stats in size["pages"].items():
+            label = f"{page} @ {size['sessions_per_user']} sessions"
+            limit = thresholds.get(page, {})
+            if "max_p95_ms" in limit and stats["p95_ms"] > limit["max_p95_ms"]:
+                violations.append(f"{label}: p95 {stats['p95_ms']}ms > {limit['max_p95_ms']}ms")
+            if "max_statements" in limit and stats["statements_per_rerun"] > limit["max_statements"]:
+                violations.append(f"{label}: SQL {stats['statements_per_rerun']}개 > {limit['max_statements']}개")
+
+            old = previous.get((size["sessions_per_user"], page))
+            if old and max_regression is not None:
+                allowed = old["p95_ms"] * (1 + max_regression)
+                if stats["p95_ms"] > allowed:
+                    violations.append(f"{label}: p95 {stats['p95_ms']}ms > 이전 {old['p95_ms']}ms의 {1 + max_regression:.0%}")
+    return violations
+
+def main():
+    parser = argparse.ArgumentParser(description="페이지별 재실행 시간과 SQL 문 수 측정 (AppTest)")
+    parser.add_argument("--sizes", default="50,500,5000", help="사용자당 세션 수 목록 (쉼표 구분)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--workdir", help="임시 DB를 만들 디렉터리")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS, help="페이지별 한도 JSON")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="이전 결과 대비 허용 p95 증가 비율")
+    parser.add_argument("--output", help="결과 JSON 파일 (생략 시 표준 출력)")
+    args = parser.parse_args()
+
+    report = run([int(s) for s in args.sizes.split(",")], args.users, args.reruns, args.workdir)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    thresholds = {}
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds, encoding="utf-8") as f:
+            thresholds = json.load(f)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    violations = check_thresholds(report, thresholds, baseline, args.max_regression if baseline else None)
+    if violations:
+        print("\n❌ 성능 한도 초과:", file=sys.stderr)
+        for violation in violations:
+            print("  -", violation, file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# benchmarks/bench_startup.py
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+# 메인 화면이 불러오는 앱 모듈
+APP_MODULES = ["database", "auth", "utils", "study_timer", "analytics", "settlement"]
+# 불러오는 데 오래 걸려 필요할 때만 불러와야 하는 모듈
+HEAVY_MODULES = ["pandas", "numpy", "PIL"]
+# 로그인 화면에서는 불러오지 않아야 하는 모듈 (로그인한 뒤에만 쓰는 화면 모듈과 PIL)
+# numpy/pandas는 쿠키 컴포넌트를 그릴 때 streamlit(pyarrow)이 불러오므로 앱 코드가 직접 불러오는지만 확인
+LOGIN_EXCLUDED_MODULES = ["utils", "study_timer", "analytics", "assets", "tier_simulation", "settlement", "PIL"]
+SECRET = "bench-startup-secret"
+
+# --- 새 프로세스에서 실행되는 측정 (결과를 JSON 한 줄로 출력) ---
+
+def _child_import():
+    """streamlit과 앱 모듈을 처음 불러오는 시간"""
+    import importlib
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+    streamlit_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for name in APP_MODULES:
+        importlib.import_module(name)
+    app_ms = (time.perf_counter() - start) * 1000
+    return {
+        "streamlit_ms": round(streamlit_ms, 3),
+        "app_modules_ms": round(app_ms, 3),
+        "heavy_loaded": [name for name in HEAVY_MODULES if name in sys.modules]
+    }
+
+class _ImportRecorder:
+    """무거운 모듈을 처음 import한 모듈 이름 기록 (sys.meta_path 맨 앞에 넣어 쓰고, 모듈을 찾지는 않음)"""
+
+    def __init__(self, names):
+        self.names = set(names)
+        self.importers = {}     # 모듈 -> (import한 모듈 이름, 앱 코드 여부)
+
+    def find_spec(self, name, path=None, target=None):
+        if name in self.names and name not in self.importers:
+            frame = sys._getframe(1)
+            while frame and ("importlib" in frame.f_code.co_filename
+                             or frame.f_code.co_filename.startswith("<frozen")):
+                frame = frame.f_back
+            if frame is not None:
+                filename = frame.f_code.co_filename
+                self.importers[name] = (frame.f_globals.get("__name__"), filename.startswith(ROOT + os.sep))
+        return None
+
+def _run_page(at, counter):
+    start = time.perf_counter()
+    at.run()
+    elapsed = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return round(elapsed, 3), counter.reset() if counter else None
+
+def _child_page(user_id):
+    """main.py 첫 실행과 재실행 시간 (user_id가 없으면 로그인 화면)
+    작업 디렉터리의 site.db를 사용
+    """
+    from streamlit.testing.v1 import AppTest
+
+    if user_id is not None:
+        # 로그인 상태를 만들려면 쿠키 매니저를 미리 바꿔야 하므로 auth를 먼저 불러옴
+        import auth
+        from session_token import issue_token
+        token = issue_token(user_id, 0)
+        auth.cookie_manager.get = lambda key: token if key == auth.SESSION_COOKIE else None
+
+    recorder = _ImportRecorder(HEAVY_MODULES)
+    sys.meta_path.insert(0, recorder)
+    at = AppTest.from_file(MAIN, default_timeout=120)
+    first_ms, _ = _run_page(at, None)
+    sys.meta_path.remove(recorder)
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    # bench_pages가 화면 모듈을 불러오므로 그 전에 확인
+    excluded = [name for name in LOGIN_EXCLUDED_MODULES if name in sys.modules]
+
+    import database
+    from benchmarks.bench_pages import StatementCounter
+    counter = StatementCounter()
+    database.set_trace_callback(counter)
+    rerun_ms, statements = _run_page(at, counter)
+    return {
+        "first_run_ms": first_ms,
+        "rerun_ms": rerun_ms,
+        "statements_per_rerun": statements,
+        "heavy_loaded_after_first_run": loaded,
+        "heavy_imported_by": {name: importer for name, (importer, _) in recorder.importers.items()},
+        "heavy_imported_by_app": sorted(name for name, (_, is_app) in recorder.importers.items() if is_app),
+        "excluded_loaded": excluded
+    }
+
+# --- 측정 실행 ---
+
+def _spawn(args, cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT, STUDY_SESSION_SECRET=SECRET, STUDY_SCHEDULER="0")
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", *args],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def _median(results, key):
+    values = sorted(r[key] for r in results)
+    return values[len(values) // 2]
+
+def _summary(results):
+    summary = {}
+    for key, value in results[0].items():
+        summary[key] = _median(results, key) if isinstance(value, (int, float)) else value
+    summary["runs"] = len(results)
+    return summary
+
+def run(repeat, workdir=None):
+    """매번 새 프로세스에서 측정해 중앙값 반환"""
+    os.environ["STUDY_SESSION_SECRET"] = SECRET
+    import database
+    from benchmarks.generate_data import generate
+
+    original_path = database.DB_PATH
+    try:
+        with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+            user_id = generate(os.path.join(tmp, "site.db"), 5, 50)[0]
+            database.close_connections()
+            # 첫 실행에 정산이 끼어들지 않도록 미리 정산해 둠
+            import settlement
+            settlement.settle_pending()
+            database.close_connections()
+
+            imports = [_spawn(["import"], tmp) for _ in range(repeat)]
+            login = [_spawn(["page"], tmp) for _ in range(repeat)]
+            logged_in = [_spawn(["page", "--user-id", str(user_id)], tmp) for _ in range(repeat)]
+    finally:
+        database.DB_PATH = original_path
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "import": _summary(imports),
+        "login_page": _summary(login),
+        "logged_in_page": _summary(logged_in)
+    }
+
+def check_login_page(summary):
+    """로그인 화면이 불러오지 않아야 할 모듈을 불러왔으면 그 목록"""
+    violations = []
+    for name in summary["excluded_loaded"]:
+        violations.append(f"로그인 화면에서 {name}을(를) 불러옴")
+    for name in summary["heavy_imported_by_app"]:
+        violations.append(f"로그인 화면에서 {summary['heavy_imported_by'][name]}이(가) {name}을(를) 직접 불러옴")
+    return violations
+
+def main():
+    parser = argparse.ArgumentParser(description="새 프로세스의 import 시간과 메인 페이지 첫 실행/재실행 시간 측정")
+    parser.add_argument("--repeat", type=int, default=5, help="측정할 프로세스 수")
+    parser.add_argument("--workdir", help="임시 DB를 만들 디렉터리")
+    parser.add_argument("--output", help="결과 JSON 파일 (생략 시 표준 출력)")
+    parser.add_argument("--child", choices=["import", "page"], help=argparse.SUPPRESS)
+    parser.add_argument("--user-id", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == "import":
+        print(json.dumps(_child_import()))
+        return
+    if args.child == "page":
+        print(json.dumps(_child_page(args.user_id)))
+        return
+
+    report = run(args.repeat, args.workdir)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    violations = check_login_page(report["login_page"])
+    if violations:
+        print("\n❌ 로그인 화면 import 검사 실패:", file=sys.stderr)
+        for violation in violations:
+            print("  -", violation, file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
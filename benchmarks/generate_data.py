@@ -0,0 +1,95 @@
+# benchmarks/generate_data.py
+
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+
+import database
+
+SUBJECTS = ["국어", "수학", "영어", "과학", "사회", "물리", "화학", "생물", "역사", "지리"]
+# 공부를 시작하는 시각 분포 (저녁 위주)
+HOUR_WEIGHTS = {
+    7: 1, 8: 2, 9: 3, 10: 3, 11: 2, 13: 2, 14: 3, 15: 3, 16: 4,
+    17: 4, 18: 5, 19: 8, 20: 9, 21: 8, 22: 6, 23: 3, 0: 1
+}
+
+def _session_rows(rng, user_id, sessions, end_day):
+    """한 사용자의 완료된 세션 행들 (하루 평균 3개, end_day 이전으로 거슬러 올라감)"""
+    hours = list(HOUR_WEIGHTS)
+    weights = list(HOUR_WEIGHTS.values())
+    # 사용자마다 잘하는 과목/시간대가 조금씩 다르게
+    subject_bias = {subject: rng.uniform(-15, 15) for subject in SUBJECTS}
+    span_days = max(1, sessions // 3)
+    rows = []
+    for _ in range(sessions):
+        day = end_day - timedelta(days=rng.randrange(span_days))
+        start = datetime.combine(day, datetime.min.time()) + timedelta(
+            hours=rng.choices(hours, weights)[0], minutes=rng.randrange(60)
+        )
+        duration = max(5, int(rng.gauss(45, 25)))
+        end = start + timedelta(minutes=duration)
+        subject = rng.choice(SUBJECTS)
+        felt = max(0, int(duration * rng.gauss(0.8, 0.15) + subject_bias[subject] * duration / 100))
+        # finish_study_session과 같은 계산
+        rate = round(min(100, max(0, (felt / duration) * 100)), 2)
+        rows.append((
+            user_id,
+            database.format_timestamp(start),
+            database.format_timestamp(end),
+            subject,
+            duration,
+            felt,
+            rate
+        ))
+    return rows
+
+def generate(path, users, sessions_per_user, seed=0, end_day=None):
+    """path에 새 DB를 만들고 users명 × sessions_per_user개 세션 채우기
+    return: 생성된 user_id 목록
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    rng = random.Random(seed)
+    end_day = end_day or datetime.now().date()
+    database.DB_PATH = path
+    database.init_db(force=True)
+
+    with database.transaction() as conn:
+        cursor = conn.cursor()
+        user_ids = []
+        for i in range(users):
+            cursor.execute(
+                "INSERT INTO users (username, password, tier_index, rank_point) VALUES (?, ?, ?, ?)",
+                (f"bench{i}", "bench", rng.randrange(20), rng.randrange(10000))
+            )
+            user_ids.append(cursor.lastrowid)
+        for user_id in user_ids:
+            cursor.executemany("""
+                INSERT INTO study_logs (user_id, start_time, end_time, subject, duration, felt_minutes, concentrate_rate)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, _session_rows(rng, user_id, sessions_per_user, end_day))
+    database.rebuild_aggregates()
+    return user_ids
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마크용 가짜 데이터 생성")
+    parser.add_argument("path", help="생성할 DB 파일 (이미 있으면 덮어씀)")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--sessions", type=int, default=500, help="사용자당 세션 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--force", action="store_true", help="앱이 쓰는 site.db도 덮어쓰기 허용")
+    args = parser.parse_args()
+
+    if os.path.abspath(args.path) == os.path.abspath("site.db") and not args.force:
+        parser.error("site.db를 덮어쓰려면 --force가 필요합니다.")
+
+    generate(args.path, args.users, args.sessions, args.seed)
+    print(f"{args.path}: {args.users}명 × {args.sessions}개 세션 생성")
+
+if __name__ == "__main__":
+    main()
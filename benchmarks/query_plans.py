@@ -0,0 +1,163 @@
+# benchmarks/query_plans.py
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+import database
+import settlement
+from benchmarks.generate_data import generate
+
+# 전체를 훑거나 임시 정렬하는 것이 정상인 경우 (함수 이름 -> 허용 대상)
+ALLOWED_SCANS = {
+    # 전체 순위/사용자 수는 인덱스 전체를 읽어야 함
+    "get_leaderboard": {"users"},
+    "get_user_rank": {"users"},
+    # 하루치 정산은 모든 사용자를 대상으로 함
+    "settle_day": {"users", "u"},
+    # 하루치 집계를 시간대(최대 24개)로 묶은 결과만 정렬
+    "get_daily_stats": {"ORDER BY"},
+}
+_PLANNED = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+def _hot_calls(user_id):
+    """(이름, 호출) 목록: 페이지와 타이머가 실제로 부르는 함수들"""
+    now = datetime.now().replace(microsecond=0)
+    yesterday = date.today() - timedelta(days=1)
+    state = {}
+
+    def start():
+        state['session_id'] = database.start_study_session(user_id, now - timedelta(minutes=40), "수학")
+
+    def finish():
+        database.finish_study_session(state['session_id'], user_id, now, "수학", 30)
+
+    def cancel():
+        session_id = database.start_study_session(user_id, now - timedelta(minutes=5), "영어")
+        database.cancel_study_session(session_id, user_id)
+
+    def delete():
+        database.delete_study_log(user_id, state['session_id'])
+
+    def settle():
+        with database.transaction() as conn:
+            conn.execute("DELETE FROM tier_settlements WHERE day = ?", (yesterday.isoformat(),))
+        settlement.settle_day(yesterday)
+
+    first_page = database.get_logs_page(user_id, limit=20)[1]
+    return [
+        ("get_user_logs", lambda: database.get_user_logs(user_id)),
+        ("get_today_total_study_time", lambda: database.get_today_total_study_time(user_id)),
+        ("get_active_session", lambda: database.get_active_session(user_id)),
+        ("start_study_session", start),
+        ("finish_study_session", finish),
+        ("delete_study_log", delete),
+        ("cancel_study_session", cancel),
+        ("get_log_totals", lambda: database.get_log_totals(user_id)),
+        ("get_logs_page", lambda: database.get_logs_page(user_id, before=first_page, limit=20)),
+        ("get_recent_logs", lambda: database.get_recent_logs(user_id)),
+        ("get_subject_summary", lambda: database.get_subject_summary(user_id)),
+        ("get_daily_summary", lambda: database.get_daily_summary(user_id)),
+        ("get_concentration_summary", lambda: database.get_concentration_summary(user_id)),
+        ("get_focus_range_counts", lambda: database.get_focus_range_counts(user_id)),
+        ("get_subject_concentration_by_time", lambda: database.get_subject_concentration_by_time(user_id)),
+        ("get_daily_stats", lambda: database.get_daily_stats(user_id)),
+        ("get_subject_priorities", lambda: database.get_subject_priorities(user_id)),
+        ("get_latest_settlement", lambda: database.get_latest_settlement(user_id)),
+        ("get_leaderboard", lambda: (database.invalidate_leaderboard(), database.get_leaderboard(50))),
+        ("get_user_rank", lambda: (database.invalidate_leaderboard(), database.get_user_rank(user_id))),
+        ("settle_day", settle),
+        ("resettle_changed", lambda: settlement.resettle_changed(yesterday - timedelta(days=settlement.MAX_CATCH_UP_DAYS))),
+    ]
+
+def collect_statements(user_id):
+    """함수별로 실행된 SQL 문 (파라미터가 채워진 형태)"""
+    statements = []
+    current = {'name': None}
+    calls = _hot_calls(user_id)
+    database.set_trace_callback(lambda sql: statements.append((current['name'], sql)))
+    try:
+        for name, call in calls:
+            current['name'] = name
+            call()
+    finally:
+        database.set_trace_callback(None)
+    return [(name, sql) for name, sql in statements if sql.lstrip().upper().startswith(_PLANNED)]
+
+def full_scans(plan):
+    """실행 계획에서 테이블(또는 그 인덱스) 전체를 읽는 단계의 대상 이름
+    상수 행과 서브쿼리/CTE 결과(MATERIALIZE, CO-ROUTINE)를 읽는 단계는 제외
+    인덱스 대신 임시 정렬을 쓰면 "ORDER BY"로 표시
+    """
+    derived = {
+        detail.split()[1] for detail in plan
+        if detail.startswith(("MATERIALIZE ", "CO-ROUTINE "))
+    }
+    scans = {
+        detail.split()[1] for detail in plan
+        if detail.startswith("SCAN ")
+        and detail != "SCAN CONSTANT ROW"
+        and detail.split()[1] not in derived
+    }
+    # 정렬을 인덱스 순서로 처리하지 못하고 결과 전체를 다시 정렬하는 경우
+    if "USE TEMP B-TREE FOR ORDER BY" in plan:
+        scans.add("ORDER BY")
+    return scans
+
+def check(path, user_id):
+    """hot 함수들의 SQL 실행 계획 검사
+    return: 위반 목록 [(함수, 대상, SQL, 실행 계획)]
+    """
+    statements = collect_statements(user_id)
+    conn = sqlite3.connect(path)
+    violations = []
+    seen = set()
+    try:
+        for name, sql in statements:
+            if (name, sql) in seen:
+                continue
+            seen.add((name, sql))
+            plan = [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            for target in sorted(full_scans(plan) - ALLOWED_SCANS.get(name, set())):
+                violations.append((name, target, " ".join(sql.split()), plan))
+    finally:
+        conn.close()
+    return violations
+
+def run(users, sessions, workdir=None):
+    """가짜 데이터 DB를 만들어 검사"""
+    original_path = database.DB_PATH
+    try:
+        with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+            path = os.path.join(tmp, "plans.db")
+            user_id = generate(path, users, sessions)[0]
+            violations = check(path, user_id)
+            database.close_connections()
+    finally:
+        database.DB_PATH = original_path
+    return violations
+
+def main():
+    parser = argparse.ArgumentParser(description="자주 쓰는 쿼리가 테이블 전체를 읽지 않는지 실행 계획 검사")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=500, help="사용자당 세션 수")
+    parser.add_argument("--workdir", help="임시 DB를 만들 디렉터리")
+    args = parser.parse_args()
+
+    violations = run(args.users, args.sessions, args.workdir)
+    if not violations:
+        print("✅ 전체 테이블 스캔/임시 정렬 없음")
+        return
+    print("❌ 전체 테이블 스캔/임시 정렬:", file=sys.stderr)
+    for name, target, sql, plan in violations:
+        print(f"  - {name}: {'임시 정렬' if target == 'ORDER BY' else 'SCAN ' + target}", file=sys.stderr)
+        print(f"    {sql}", file=sys.stderr)
+        for detail in plan:
+            print(f"      {detail}", file=sys.stderr)
+    sys.exit(1)
+
+if __name__ == "__main__":
+    main()
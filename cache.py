@@ -0,0 +1,65 @@
+# cache.py
+
+import threading
+import time
+
+class TTLCache:
+    """짧은 시간(ttl초) 동안만 값을 보관하는 공유 캐시
+    같은 키를 여러 스레드가 동시에 조회하면 한 스레드만 값을 계산하고 나머지는 기다림
+    """
+
+    def __init__(self, ttl, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}       # key -> (만료 시각, value)
+        self._key_locks = {}     # key -> 계산 중 잠금
+        self._generation = 0     # clear() 횟수
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        """유효한 값이 있으면 반환, 없으면 loader()로 계산해서 저장"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # 기다리는 동안 다른 스레드가 계산했을 수 있음
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    return entry[1]
+            generation = self._generation
+            value = loader()
+            with self._lock:
+                # 계산 도중 clear()되었다면 오래된 값일 수 있으므로 저장하지 않음
+                if generation == self._generation:
+                    if len(self._entries) >= self.max_entries:
+                        self._evict_expired()
+                    self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._key_locks.pop(key, None)
+            return value
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        # 그래도 가득 차 있으면 전부 비움
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+
+    def clear(self):
+        """전체 무효화 (데이터가 바뀌었을 때 호출)"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        """현재 항목 수와 유효 시간"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'ttl': self.ttl
+            }
@@ -1,13 +1,176 @@
 # database.py
 
+import itertools
+import os
+import queue
 import sqlite3
-import pandas as pd
+import threading
+from contextlib import contextmanager
+# pandas는 불러오는 데만 0.3초 넘게 걸리므로 쓰는 함수 안에서 import (정산/가져오기 CLI는 pandas 없이 동작)
 from datetime import date, datetime
+from cache import TTLCache
+from instrumentation import connection_factory, instrument_namespace
 
 DB_PATH = "site.db"
 
+# 커넥션 풀 설정
+BUSY_TIMEOUT_MS = 5000        # 잠금 대기 시간 (ms)
+STATEMENT_CACHE_SIZE = 128    # 커넥션별 prepared statement 캐시 크기
+MAX_IDLE_CONNECTIONS = 8      # 풀에 보관할 유휴 커넥션 수
+
+# 모든 커넥션에서 실행되는 SQL 문을 받을 콜백 (측정용, 기본은 없음)
+_trace_callback = None
+
+def set_trace_callback(callback):
+    """실행되는 SQL 문마다 callback(sql) 호출 (None이면 해제)
+    이후 새로 여는 커넥션부터 적용되므로 유휴 커넥션은 닫음
+    """
+    global _trace_callback
+    _trace_callback = callback
+    close_connections()
+
+def _open_connection(path):
+    """새 커넥션 생성 및 PRAGMA 설정"""
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,  # 풀에서 스레드 간 재사용
+        factory=connection_factory()  # 측정이 켜져 있으면 SQL 시간 기록
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    if _trace_callback is not None:
+        conn.set_trace_callback(_trace_callback)
+    return conn
+
+class ConnectionPool:
+    """스레드 간에 재사용되는 SQLite 커넥션 풀"""
+
+    def __init__(self, path, max_idle=MAX_IDLE_CONNECTIONS):
+        self.path = path
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._local = threading.local()
+
+    @contextmanager
+    def connection(self):
+        """커넥션 대여 (같은 스레드에서 중첩 호출 시 같은 커넥션 재사용)"""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+        
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = _open_connection(self.path)
+        
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            # 끝나지 않은 트랜잭션은 반납 전에 정리
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close_all(self):
+        """유휴 커넥션 모두 닫기"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool():
+    """현재 DB_PATH에 대한 커넥션 풀 반환"""
+    pool = _pools.get(DB_PATH)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(DB_PATH, ConnectionPool(DB_PATH))
+    return pool
+
+def connection():
+    """풀에서 커넥션 대여 (with 문으로 사용)"""
+    return get_pool().connection()
+
+# 바깥 트랜잭션이 커밋된 뒤 실행할 함수 목록 (스레드별, 트랜잭션 밖이면 None)
+_commit_hooks = threading.local()
+
+@contextmanager
+def transaction(immediate=False):
+    """쓰기 트랜잭션 (성공 시 커밋, 예외 시 롤백, 중첩 시 바깥 트랜잭션에 합류)
+    after_commit으로 등록한 함수는 가장 바깥 트랜잭션이 커밋된 뒤에 실행
+    """
+    with connection() as conn:
+        if conn.in_transaction or getattr(_commit_hooks, "pending", None) is not None:
+            yield conn
+            return
+        _commit_hooks.pending = []
+        try:
+            if immediate:
+                # 시작부터 쓰기 잠금 확보 (DDL까지 하나의 트랜잭션으로 묶기)
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            callbacks, _commit_hooks.pending = _commit_hooks.pending, None
+        for callback in callbacks:
+            callback()
+
+def after_commit(callback):
+    """
+    지금 트랜잭션이 커밋된 뒤 callback() 실행 (트랜잭션 밖이면 바로 실행, 롤백되면 실행하지 않음)
+    db_writer의 SAVEPOINT처럼 일부만 되돌린 경우에도 실행되므로 캐시 비우기처럼 여러 번 해도 되는 일에만 사용
+    """
+    pending = getattr(_commit_hooks, "pending", None)
+    if pending is None:
+        callback()
+    elif callback not in pending:
+        pending.append(callback)
+
+def close_connections():
+    """모든 풀의 유휴 커넥션 닫기 (종료/테스트용)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+
+# 저장 시각 형식 (DB에는 이 형식의 문자열만 저장)
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+def format_timestamp(dt):
+    """datetime을 저장용 문자열로 변환"""
+    return dt.strftime(TIMESTAMP_FORMAT)
+
+def parse_timestamp(dt_str):
+    """저장된 시각 문자열 하나를 datetime으로 변환"""
+    if dt_str is None:
+        return None
+    try:
+        return datetime.strptime(dt_str, TIMESTAMP_FORMAT)
+    except (TypeError, ValueError):
+        # 마이그레이션 이전 형식이 남아 있는 경우
+        return safe_parse_datetime(dt_str)
+
+def parse_timestamp_column(series):
+    """시각 문자열 컬럼 전체를 한 번에 변환 (벡터화)"""
+    import pandas as pd
+    return pd.to_datetime(series, format=TIMESTAMP_FORMAT, errors='coerce')
+
 def safe_parse_datetime(dt_str):
     """안전한 시간 형식 파싱"""
+    import pandas as pd
     if pd.isna(dt_str):
         return None
     try:
@@ -25,256 +188,676 @@ def safe_parse_datetime(dt_str):
                 # 마지막 시도: 자동 감지
                 return pd.to_datetime(dt_str)
 
-def init_db():
-    """데이터베이스 초기화"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def _migrate_canonical_timestamps(cursor):
+    """start_time/end_time을 TIMESTAMP_FORMAT 문자열로 일괄 변환"""
+    # SQLite가 해석할 수 있는 값은 UPDATE 한 번으로 변환
+    for column in ("start_time", "end_time"):
+        cursor.execute(f"""
+            UPDATE study_logs
+            SET {column} = strftime('%Y-%m-%dT%H:%M:%S', {column})
+            WHERE typeof({column}) = 'text'
+            AND strftime('%Y-%m-%dT%H:%M:%S', {column}) IS NOT NULL
+            AND {column} != strftime('%Y-%m-%dT%H:%M:%S', {column})
+        """)
     
-    # 사용자 테이블
+    # 나머지 (SQLite가 못 읽는 형식)만 pandas로 파싱해서 일괄 갱신
+    cursor.execute("""
+        SELECT id, start_time, end_time
+        FROM study_logs
+        WHERE strftime('%Y-%m-%dT%H:%M:%S', start_time) IS NOT start_time
+        OR (end_time IS NOT NULL AND strftime('%Y-%m-%dT%H:%M:%S', end_time) IS NOT end_time)
+    """)
+    updates = []
+    for log_id, start_time, end_time in cursor.fetchall():
+        try:
+            start = safe_parse_datetime(start_time)
+            end = safe_parse_datetime(end_time)
+        except (TypeError, ValueError):
+            # 해석할 수 없는 값은 그대로 둠
+            continue
+        updates.append((
+            format_timestamp(start) if start is not None else start_time,
+            format_timestamp(end) if end is not None else end_time,
+            log_id
+        ))
+    cursor.executemany("UPDATE study_logs SET start_time = ?, end_time = ? WHERE id = ?", updates)
+
+def _migrate_daily_rollup(cursor):
+    """일일 집계 테이블 생성 및 기존 기록으로 채우기"""
     cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL,
-        tier_index INTEGER DEFAULT 0,
-        rank_point INTEGER DEFAULT 0
-    )
+    CREATE TABLE IF NOT EXISTS daily_rollup (
+        user_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        hour INTEGER NOT NULL,
+        minutes INTEGER NOT NULL DEFAULT 0,
+        session_count INTEGER NOT NULL DEFAULT 0,
+        focus_sum REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, day, subject, hour)
+    ) WITHOUT ROWID
     ''')
-    
-    # 공부 기록 테이블 (통합)
+    _rebuild_rollup(cursor)
+
+def _migrate_tier_settlements(cursor):
+    """일일 티어 정산 기록 테이블 (user_id, day 당 한 번만 정산)"""
     cursor.execute('''
-    CREATE TABLE IF NOT EXISTS study_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
+    CREATE TABLE IF NOT EXISTS tier_settlements (
         user_id INTEGER NOT NULL,
-        start_time TIMESTAMP NOT NULL,
-        end_time TIMESTAMP,
-        subject TEXT NOT NULL,
-        duration INTEGER,
-        felt_minutes INTEGER,
-        concentrate_rate REAL,
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    )
+        day TEXT NOT NULL,
+        minutes INTEGER NOT NULL,
+        tier_before INTEGER NOT NULL,
+        point_before INTEGER NOT NULL,
+        tier_after INTEGER NOT NULL,
+        point_after INTEGER NOT NULL,
+        message TEXT,
+        settled_at TEXT NOT NULL,
+        PRIMARY KEY (user_id, day)
+    ) WITHOUT ROWID
     ''')
-    
-    # 인덱스 생성
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_study_logs_user_id ON study_logs(user_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_study_logs_start_time ON study_logs(start_time)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_study_logs_subject ON study_logs(subject)')
-    
-    # 과목 우선순위 테이블
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tier_settlements_day ON tier_settlements(day)')
+    # 정산 시 날짜 단위로 전체 사용자 집계를 읽기 위한 인덱스
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_daily_rollup_day ON daily_rollup(day, user_id, minutes)')
+
+def _migrate_leaderboard_index(cursor):
+    """리더보드 정렬/순위 계산용 인덱스"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_rank_point ON users(rank_point DESC, id)')
+
+def _migrate_composite_indexes(cursor):
+    """실제 조회 패턴(사용자 + 시각/과목)에 맞춘 복합/부분 인덱스로 교체"""
+    # 사용자별 시각 정렬/범위 조회 (기록 목록, 페이지, 가져오기 중복 검사)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_study_logs_user_start ON study_logs(user_id, start_time)')
+    # 진행 중인 세션만 담는 부분 인덱스
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_study_logs_active
+        ON study_logs(user_id, start_time) WHERE end_time IS NULL
+    """)
+    # 과목별 집계를 테이블 조회 없이 처리하는 커버링 인덱스
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_study_logs_user_subject
+        ON study_logs(user_id, subject, start_time, duration, concentrate_rate)
+    """)
+    # 위 인덱스들과 겹치거나 쓰이지 않는 단일 컬럼 인덱스 제거
+    cursor.execute('DROP INDEX IF EXISTS idx_study_logs_user_id')
+    cursor.execute('DROP INDEX IF EXISTS idx_study_logs_start_time')
+    cursor.execute('DROP INDEX IF EXISTS idx_study_logs_subject')
+    cursor.execute('ANALYZE study_logs')
+
+def _migrate_concentration_cube(cursor):
+    """(사용자, 과목, 요일, 시간)별 집중도 합계 테이블 생성 및 기존 기록으로 채우기"""
     cursor.execute('''
-    CREATE TABLE IF NOT EXISTS subject_priorities (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
+    CREATE TABLE IF NOT EXISTS concentration_cube (
         user_id INTEGER NOT NULL,
         subject TEXT NOT NULL,
-        priority INTEGER DEFAULT 1,
-        target_minutes INTEGER,
-        UNIQUE(user_id, subject),
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    )
+        weekday INTEGER NOT NULL,      -- 0=일요일 ... 6=토요일
+        hour INTEGER NOT NULL,
+        session_count INTEGER NOT NULL DEFAULT 0,
+        rate_sum REAL NOT NULL DEFAULT 0,
+        rate_sumsq REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, subject, weekday, hour)
+    ) WITHOUT ROWID
     ''')
-    
-    conn.commit()
-    conn.close()
-
-def create_user_log_table(user_id):
-    """사용자별 개별 로그 테이블 생성"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    table_name = f"log_user_{user_id}"
+    _rebuild_cube(cursor)
+
+def _migrate_session_epoch(cursor):
+    """로그인 토큰 무효화를 위한 사용자별 세대 번호 (로그아웃하면 증가)"""
+    cursor.execute("ALTER TABLE users ADD COLUMN session_epoch INTEGER NOT NULL DEFAULT 0")
+
+def _migrate_state_version(cursor):
+    """로그인 정보 스냅샷 확인용 사용자별 버전 (티어/점수/로그인 세대를 바꾸는 UPDATE에서 함께 증가)
+    DB에 있으므로 다른 워커 프로세스에서 바뀐 것도 바로 알 수 있음
+    """
+    cursor.execute("ALTER TABLE users ADD COLUMN state_version INTEGER NOT NULL DEFAULT 0")
+
+def _migrate_created_day(cursor):
+    """가입한 날 (YYYY-MM-DD, 이 날부터 정산)
+    예전 DB의 created_at(UTC)이 있으면 그 날짜, 없으면 첫 공부 기록 날짜로 채움 (둘 다 없으면 NULL)
+    """
+    cursor.execute("ALTER TABLE users ADD COLUMN created_day TEXT")
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(users)")}
+    signup = "DATE(created_at, 'localtime')" if "created_at" in columns else "NULL"
     cursor.execute(f"""
-        CREATE TABLE IF NOT EXISTS {table_name} (
-            id            INTEGER PRIMARY KEY AUTOINCREMENT,
-            start_time    TEXT,
-            end_time      TEXT,
-            subject       TEXT,
-            felt_minutes  INTEGER,
-            concentrate_rate REAL
-        )
+        UPDATE users SET created_day = COALESCE({signup}, (
+            SELECT MIN(day) FROM daily_rollup WHERE daily_rollup.user_id = users.id
+        ))
     """)
-    # 성능을 위한 인덱스 생성
-    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_start_time ON {table_name}(start_time)")
-    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_subject ON {table_name}(subject)")
-    conn.commit()
-    conn.close()
-    return table_name
-
-def get_user_by_credentials(username=None, password=None, user_id=None):
-    """로그인 인증 또는 user_id로 사용자 정보 조회"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+
+# 스키마 마이그레이션 목록 (PRAGMA user_version = 적용된 마이그레이션 수)
+MIGRATIONS = [
+    _migrate_canonical_timestamps,
+    _migrate_daily_rollup,
+    _migrate_tier_settlements,
+    _migrate_leaderboard_index,
+    _migrate_composite_indexes,
+    _migrate_concentration_cube,
+    _migrate_session_epoch,
+    _migrate_state_version,
+    _migrate_created_day,
+]
+
+def _run_migrations(cursor):
+    """아직 적용되지 않은 마이그레이션 실행"""
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        migration(cursor)
+        cursor.execute(f"PRAGMA user_version = {number}")
+
+# 이 프로세스에서 초기화를 마친 DB 파일
+_initialized_paths = set()
+_init_lock = threading.Lock()
+
+def init_db(force=False):
+    """
+    데이터베이스 초기화 (프로세스당 DB 파일마다 한 번만)
+    스키마가 이미 최신이면 user_version만 읽고 끝나므로 쓰기 잠금을 잡지 않음
+    force: 파일을 새로 만든 경우처럼 이미 초기화했어도 다시 확인
+    """
+    path = DB_PATH
+    if path in _initialized_paths and not force:
+        return
+    with _init_lock:
+        if path in _initialized_paths and not force:
+            return
+        with connection() as conn:
+            cursor = conn.cursor()
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            has_legacy_tables = bool(_legacy_log_tables(cursor, 1))
+        
+        if version < len(MIGRATIONS):
+            _create_schema()
+        # 예전 사용자별 로그 테이블이 남아 있으면 통합 테이블로 옮기고 삭제
+        if has_legacy_tables:
+            retire_user_log_tables()
+        _initialized_paths.add(path)
+
+def _create_schema():
+    """기본 테이블 생성 후 남은 마이그레이션 실행 (하나의 트랜잭션)"""
+    with transaction(immediate=True) as conn:
+        cursor = conn.cursor()
+        
+        # 사용자 테이블
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            tier_index INTEGER DEFAULT 0,
+            rank_point INTEGER DEFAULT 0
+        )
+        ''')
+        
+        # 공부 기록 테이블 (통합)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS study_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            start_time TIMESTAMP NOT NULL,
+            end_time TIMESTAMP,
+            subject TEXT NOT NULL,
+            duration INTEGER,
+            felt_minutes INTEGER,
+            concentrate_rate REAL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        ''')
+        
+        # 인덱스는 마이그레이션에서 생성 (_migrate_composite_indexes)
+        
+        # 과목 우선순위 테이블
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS subject_priorities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            priority INTEGER DEFAULT 1,
+            target_minutes INTEGER,
+            UNIQUE(user_id, subject),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        ''')
+        
+        _run_migrations(cursor)
+
+# 한 트랜잭션에서 옮기고 삭제할 예전 로그 테이블 수
+LOG_TABLE_RETIRE_BATCH = 100
+
+def _legacy_log_tables(cursor, limit):
+    cursor.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND name GLOB 'log_user_[0-9]*' AND name NOT GLOB 'log_user_*[^0-9]*'
+        LIMIT ?
+    """, (limit,))
+    return [row[0] for row in cursor.fetchall()]
+
+def retire_user_log_tables(batch_size=LOG_TABLE_RETIRE_BATCH):
+    """
+    예전 log_user_{id} 테이블의 완료된 기록을 study_logs로 옮긴 뒤 테이블 삭제
+    batch_size개씩 별도 트랜잭션으로 처리하므로 테이블이 많아도 잠금이 길어지지 않음
+    같은 시작 시각의 기록이 이미 있으면 건너뛰므로 중간에 멈췄다가 다시 실행해도 안전
+    return: 삭제한 테이블 수
+    """
+    retired = 0
+    while True:
+        with transaction(immediate=True) as conn:
+            cursor = conn.cursor()
+            tables = _legacy_log_tables(cursor, batch_size)
+            if not tables:
+                break
+            
+            for table_name in tables:
+                user_id = int(table_name[len("log_user_"):])
+                cursor.execute("SELECT 1 FROM users WHERE id = ?", (user_id,))
+                # 탈퇴한 사용자의 테이블은 옮기지 않고 삭제만
+                if cursor.fetchone() is not None:
+                    cursor.execute(f"""
+                        INSERT INTO study_logs
+                            (user_id, start_time, end_time, subject, duration, felt_minutes, concentrate_rate)
+                        SELECT
+                            :user_id,
+                            COALESCE(strftime('%Y-%m-%dT%H:%M:%S', l.start_time), l.start_time),
+                            COALESCE(strftime('%Y-%m-%dT%H:%M:%S', l.end_time), l.end_time),
+                            COALESCE(l.subject, ''),
+                            (strftime('%s', l.end_time) - strftime('%s', l.start_time)) / 60,
+                            l.felt_minutes,
+                            l.concentrate_rate
+                        FROM {table_name} l
+                        -- 완료되지 않은 예전 세션은 이어서 진행할 수 없으므로 옮기지 않음
+                        WHERE l.start_time IS NOT NULL AND l.end_time IS NOT NULL
+                        AND NOT EXISTS (
+                            SELECT 1 FROM study_logs s
+                            WHERE s.user_id = :user_id
+                            AND s.start_time = COALESCE(strftime('%Y-%m-%dT%H:%M:%S', l.start_time), l.start_time)
+                        )
+                    """, {'user_id': user_id})
+                    if cursor.rowcount > 0:
+                        _rebuild_aggregates(cursor, user_id)
+                cursor.execute(f"DROP TABLE {table_name}")
+                retired += 1
+    return retired
+
+def _rebuild_rollup(cursor, user_id=None):
+    """일일 집계를 study_logs에서 다시 계산 (user_id가 None이면 전체)"""
+    condition = "" if user_id is None else "AND user_id = :user_id"
+    cursor.execute(f"DELETE FROM daily_rollup WHERE 1 = 1 {condition}", {'user_id': user_id})
+    cursor.execute(f"""
+        INSERT INTO daily_rollup (user_id, day, subject, hour, minutes, session_count, focus_sum)
+        SELECT 
+            user_id,
+            DATE(start_time),
+            subject,
+            CAST(strftime('%H', start_time) AS INTEGER),
+            COALESCE(SUM(duration), 0),
+            COUNT(*),
+            COALESCE(SUM(concentrate_rate), 0)
+        FROM study_logs
+        WHERE end_time IS NOT NULL {condition}
+        GROUP BY user_id, DATE(start_time), subject, strftime('%H', start_time)
+    """, {'user_id': user_id})
+
+def _rebuild_cube(cursor, user_id=None):
+    """집중도 큐브를 study_logs에서 다시 계산 (user_id가 None이면 전체)"""
+    condition = "" if user_id is None else "AND user_id = :user_id"
+    cursor.execute(f"DELETE FROM concentration_cube WHERE 1 = 1 {condition}", {'user_id': user_id})
+    cursor.execute(f"""
+        INSERT INTO concentration_cube (user_id, subject, weekday, hour, session_count, rate_sum, rate_sumsq)
+        SELECT 
+            user_id,
+            subject,
+            CAST(strftime('%w', start_time) AS INTEGER),
+            CAST(strftime('%H', start_time) AS INTEGER),
+            COUNT(*),
+            SUM(concentrate_rate),
+            SUM(concentrate_rate * concentrate_rate)
+        FROM study_logs
+        WHERE end_time IS NOT NULL AND concentrate_rate IS NOT NULL {condition}
+        GROUP BY user_id, subject, strftime('%w', start_time), strftime('%H', start_time)
+    """, {'user_id': user_id})
+
+def _rebuild_aggregates(cursor, user_id=None):
+    """일일 집계와 집중도 큐브 재계산"""
+    _rebuild_rollup(cursor, user_id)
+    _rebuild_cube(cursor, user_id)
+
+def rebuild_aggregates(user_id=None):
+    """일일 집계와 집중도 큐브 재계산 (기록을 직접 넣은 뒤 한 번 호출)"""
+    with transaction() as conn:
+        _rebuild_aggregates(conn.cursor(), user_id)
+
+def _apply_to_aggregates(cursor, user_id, start_time, subject, duration, rate, sign=1):
+    """완료된 세션 하나를 일일 집계와 집중도 큐브에 더하기(sign=1) 또는 빼기(sign=-1)"""
+    day = start_time[:10]
+    hour = int(start_time[11:13])
+    _apply_to_cube(cursor, user_id, start_time, subject, rate, sign)
+    cursor.execute("""
+        INSERT INTO daily_rollup (user_id, day, subject, hour, minutes, session_count, focus_sum)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, day, subject, hour) DO UPDATE SET
+            minutes = minutes + excluded.minutes,
+            session_count = session_count + excluded.session_count,
+            focus_sum = focus_sum + excluded.focus_sum
+    """, (user_id, day, subject, hour, sign * (duration or 0), sign, sign * (rate or 0)))
+    
+    if sign < 0:
+        # 더 이상 세션이 없는 집계 행은 정리
+        cursor.execute("""
+            DELETE FROM daily_rollup
+            WHERE user_id = ? AND day = ? AND subject = ? AND hour = ? AND session_count <= 0
+        """, (user_id, day, subject, hour))
+
+def _apply_to_cube(cursor, user_id, start_time, subject, rate, sign):
+    """세션 하나의 집중도를 (과목, 요일, 시간) 칸에 더하거나 빼기"""
+    if rate is None:
+        return
+    # SQLite strftime('%w')와 같은 번호 (0=일요일)
+    weekday = date.fromisoformat(start_time[:10]).isoweekday() % 7
+    hour = int(start_time[11:13])
+    cursor.execute("""
+        INSERT INTO concentration_cube (user_id, subject, weekday, hour, session_count, rate_sum, rate_sumsq)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, subject, weekday, hour) DO UPDATE SET
+            session_count = session_count + excluded.session_count,
+            rate_sum = rate_sum + excluded.rate_sum,
+            rate_sumsq = rate_sumsq + excluded.rate_sumsq
+    """, (user_id, subject, weekday, hour, sign, sign * rate, sign * rate * rate))
     
-    if user_id is not None:
+    if sign < 0:
         cursor.execute("""
-            SELECT id, username, tier_index, rank_point 
+            DELETE FROM concentration_cube
+            WHERE user_id = ? AND subject = ? AND weekday = ? AND hour = ? AND session_count <= 0
+        """, (user_id, subject, weekday, hour))
+
+def get_user(user_id):
+    """user_id로 사용자 정보 조회
+    return: (id, username, tier_index, rank_point, session_epoch, state_version)
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, username, tier_index, rank_point, session_epoch, state_version
             FROM users 
             WHERE id = ?
         """, (user_id,))
-    else:
+        row = cursor.fetchone()
+    return row
+
+def get_login_user(username):
+    """로그인할 아이디의 사용자 정보와 저장된 비밀번호 (확인은 passwords.check_password로)
+    return: (id, username, tier_index, rank_point, session_epoch, state_version, password)
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
         cursor.execute("""
-            SELECT id, username, tier_index, rank_point 
+            SELECT id, username, tier_index, rank_point, session_epoch, state_version, password
             FROM users 
-            WHERE username = ? AND password = ?
-        """, (username, password))
-    
-    row = cursor.fetchone()
-    conn.close()
+            WHERE username = ?
+        """, (username,))
+        row = cursor.fetchone()
     return row
 
-def create_user(username, password):
-    """회원가입 + 개별 로그 테이블 생성"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
+def update_password_hash(user_id, old_password, new_password):
+    """저장된 비밀번호를 새 해시로 교체 (그 사이 바뀌었으면 건드리지 않음)
+    return: 교체했으면 True
+    """
+    with transaction() as conn:
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password))
-        user_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        # 사용자 전용 로그 테이블 생성
-        create_user_log_table(user_id)
+        cursor.execute("UPDATE users SET password = ? WHERE id = ? AND password = ?",
+                       (new_password, user_id, old_password))
+        return cursor.rowcount > 0
+
+def revoke_sessions(user_id):
+    """사용자의 모든 로그인 토큰 무효화 (로그아웃)"""
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE users SET session_epoch = session_epoch + 1, state_version = state_version + 1
+            WHERE id = ?
+        """, (user_id,))
+
+def create_user(username, password_hash):
+    """회원가입 (password_hash: passwords.make_password_hash로 만든 해시)"""
+    try:
+        with transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO users (username, password, created_day) VALUES (?, ?, ?)",
+                (username, password_hash, date.today().isoformat())
+            )
         return True
     except sqlite3.IntegrityError:
         return False
 
 def get_today_total_study_time(user_id):
-    """사용자의 오늘 공부 총 시간 조회"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
+    """사용자의 오늘 공부 총 시간 조회 (일일 집계 테이블 사용)"""
     today_str = date.today().isoformat()
-    cursor.execute("""
-        SELECT SUM(duration)
-        FROM study_logs
-        WHERE user_id = ? 
-        AND DATE(start_time) = ?
-        AND end_time IS NOT NULL
-    """, (user_id, today_str))
-    
-    result = cursor.fetchone()[0]
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT SUM(minutes)
+            FROM daily_rollup
+            WHERE user_id = ? AND day = ?
+        """, (user_id, today_str))
+        
+        result = cursor.fetchone()[0]
     return int(result) if result else 0
 
-def get_user_logs(user_id):
-    """사용자의 공부 기록 조회"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT 
-            id,
-            start_time,
-            end_time,
-            subject,
-            duration,
-            felt_minutes,
-            concentrate_rate
-        FROM study_logs
-        WHERE user_id = ?
-        ORDER BY start_time DESC
-    """, (user_id,))
-    
-    logs = cursor.fetchall()
-    conn.close()
-    
-    if not logs:
-        return pd.DataFrame()
-    
-    df = pd.DataFrame(logs, columns=[
-        'id',
-        'start_time',
-        'end_time',
-        'subject',
-        'duration',
-        'felt_minutes',
-        'concentrate_rate'
-    ])
-    
-   
-    
-    df['start_time'] = df['start_time'].apply(safe_parse_datetime)
-    df['end_time'] = df['end_time'].apply(safe_parse_datetime)
-    
+LOG_COLUMNS = [
+    'id',
+    'start_time',
+    'end_time',
+    'subject',
+    'duration',
+    'felt_minutes',
+    'concentrate_rate'
+]
+
+def _logs_to_frame(logs):
+    """조회한 행들을 시각 컬럼이 변환된 DataFrame으로 만들기"""
+    import pandas as pd
+    df = pd.DataFrame(logs, columns=LOG_COLUMNS)
+    # 진행 중 세션(None)이 섞여도 조회 범위와 관계없이 같은 dtype 유지
+    numeric_columns = ['duration', 'felt_minutes', 'concentrate_rate']
+    df[numeric_columns] = df[numeric_columns].astype('float64')
+    df['start_time'] = parse_timestamp_column(df['start_time'])
+    df['end_time'] = parse_timestamp_column(df['end_time'])
     return df
 
+def get_user_logs(user_id):
+    """사용자의 전체 공부 기록 조회 (화면은 집계/페이지 조회를 쓰므로 내보내기·분석용)"""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT 
+                id,
+                start_time,
+                end_time,
+                subject,
+                duration,
+                felt_minutes,
+                concentrate_rate
+            FROM study_logs
+            WHERE user_id = ?
+            ORDER BY start_time DESC
+        """, (user_id,))
+        logs = cursor.fetchall()
+    return _logs_to_frame(logs)
+
 def start_study_session(user_id, start_time, subject=""):
     """공부 세션 시작"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT INTO study_logs (user_id, start_time, subject) 
-        VALUES (?, ?, ?)
-    """, (user_id, start_time.strftime('%Y-%m-%dT%H:%M:%S'), subject))
-    
-    session_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO study_logs (user_id, start_time, subject) 
+            VALUES (?, ?, ?)
+        """, (user_id, format_timestamp(start_time), subject))
+        
+        session_id = cursor.lastrowid
     return session_id
 
 def get_active_session(user_id):
     """진행 중인 세션 조회"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT id, start_time, subject 
-        FROM study_logs
-        WHERE user_id = ? AND end_time IS NULL
-        ORDER BY start_time DESC 
-        LIMIT 1
-    """, (user_id,))
-    
-    row = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, start_time, subject 
+            FROM study_logs
+            WHERE user_id = ? AND end_time IS NULL
+            ORDER BY start_time DESC 
+            LIMIT 1
+        """, (user_id,))
+        
+        row = cursor.fetchone()
     
     if row:
         return {
             'id': row[0],
-            'start_time': safe_parse_datetime(row[1]),
+            'start_time': parse_timestamp(row[1]),
             'subject': row[2] or ""
         }
     return None
 
-def finish_study_session(session_id, user_id, end_time, subject, felt_minutes):
-    """진행 중인 세션 완료"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # 세션 정보 조회
-    cursor.execute("SELECT start_time FROM study_logs WHERE id = ? AND user_id = ?", 
-                  (session_id, user_id))
-    row = cursor.fetchone()
-    if not row:
-        conn.close()
-        return 0
-    
-    start_time = safe_parse_datetime(row[0])
+def compute_session_metrics(start_time, end_time, felt_minutes):
+    """세션 길이(분)와 집중도(%) 계산 (세션 완료와 가져오기에서 공통 사용)"""
     duration_minutes = int((end_time - start_time).total_seconds() / 60)
     rate = 0.0
     if duration_minutes > 0:
         rate = round(min(100, max(0, (felt_minutes / duration_minutes) * 100)), 2)
+    return duration_minutes, rate
+
+def finish_study_session(session_id, user_id, end_time, subject, felt_minutes):
+    """진행 중인 세션 완료"""
+    with transaction() as conn:
+        cursor = conn.cursor()
+        
+        # 세션 정보 조회
+        cursor.execute("""
+            SELECT start_time, end_time, subject, duration, concentrate_rate
+            FROM study_logs WHERE id = ? AND user_id = ?
+        """, (session_id, user_id))
+        row = cursor.fetchone()
+        if not row:
+            return 0
+        
+        # 이미 완료된 세션을 다시 완료하는 경우 기존 집계를 먼저 되돌림
+        if row[1] is not None:
+            _apply_to_aggregates(cursor, user_id, row[0], row[2], row[3], row[4], sign=-1)
+        
+        duration_minutes, rate = compute_session_metrics(parse_timestamp(row[0]), end_time, felt_minutes)
+        
+        # 세션 완료 처리
+        cursor.execute("""
+            UPDATE study_logs
+            SET end_time = ?, subject = ?, felt_minutes = ?, concentrate_rate = ?, duration = ?
+            WHERE id = ? AND user_id = ?
+        """, (format_timestamp(end_time), subject, felt_minutes, rate, duration_minutes, session_id, user_id))
+        
+        # 일일 집계 반영 (같은 트랜잭션)
+        _apply_to_aggregates(cursor, user_id, row[0], subject, duration_minutes, rate)
     
-    # 세션 완료 처리
+    return duration_minutes
+
+def _add_to_aggregates(cursor, user_id, after_id):
+    """id가 after_id보다 큰 사용자의 완료 세션들을 일일 집계와 집중도 큐브에 한 번에 더하기"""
+    params = {'user_id': user_id, 'after_id': after_id}
     cursor.execute("""
-        UPDATE study_logs
-        SET end_time = ?, subject = ?, felt_minutes = ?, concentrate_rate = ?, duration = ?
-        WHERE id = ? AND user_id = ?
-    """, (end_time.strftime('%Y-%m-%dT%H:%M:%S'), subject, felt_minutes, rate, duration_minutes, session_id, user_id))
+        INSERT INTO daily_rollup (user_id, day, subject, hour, minutes, session_count, focus_sum)
+        SELECT 
+            user_id,
+            DATE(start_time),
+            subject,
+            CAST(strftime('%H', start_time) AS INTEGER),
+            COALESCE(SUM(duration), 0),
+            COUNT(*),
+            COALESCE(SUM(concentrate_rate), 0)
+        FROM study_logs
+        WHERE user_id = :user_id AND id > :after_id AND end_time IS NOT NULL
+        GROUP BY DATE(start_time), subject, strftime('%H', start_time)
+        ON CONFLICT(user_id, day, subject, hour) DO UPDATE SET
+            minutes = minutes + excluded.minutes,
+            session_count = session_count + excluded.session_count,
+            focus_sum = focus_sum + excluded.focus_sum
+    """, params)
+    cursor.execute("""
+        INSERT INTO concentration_cube (user_id, subject, weekday, hour, session_count, rate_sum, rate_sumsq)
+        SELECT 
+            user_id,
+            subject,
+            CAST(strftime('%w', start_time) AS INTEGER),
+            CAST(strftime('%H', start_time) AS INTEGER),
+            COUNT(*),
+            SUM(concentrate_rate),
+            SUM(concentrate_rate * concentrate_rate)
+        FROM study_logs
+        WHERE user_id = :user_id AND id > :after_id
+        AND end_time IS NOT NULL AND concentrate_rate IS NOT NULL
+        GROUP BY subject, strftime('%w', start_time), strftime('%H', start_time)
+        ON CONFLICT(user_id, subject, weekday, hour) DO UPDATE SET
+            session_count = session_count + excluded.session_count,
+            rate_sum = rate_sum + excluded.rate_sum,
+            rate_sumsq = rate_sumsq + excluded.rate_sumsq
+    """, params)
+
+# 가져오기 시 한 번에 넣는 행 수
+IMPORT_BATCH_SIZE = 5000
+
+def insert_study_logs(user_id, sessions, batch_size=IMPORT_BATCH_SIZE):
+    """
+    완료된 세션 여러 개를 batch_size개씩 나눠 저장 (과거 기록 가져오기용)
+    sessions: (start_time, end_time, subject, felt_minutes) 반복자, 시각은 datetime
+    각 묶음은 쓰기 잠금 없이 먼저 변환한 뒤 짧은 트랜잭션 하나로 저장하고 집계에 더하므로
+    큰 파일을 가져오는 동안에도 앱의 쓰기가 오래 기다리지 않음
+    같은 시작 시각의 기록이 이미 있으면 건너뛰므로 같은 파일을 다시 가져와도(중간에 멈췄어도) 중복되지 않음
+    return: 새로 저장한 행 수
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM users WHERE id = ?", (user_id,))
+        if cursor.fetchone() is None:
+            raise ValueError(f"존재하지 않는 사용자입니다: {user_id}")
     
-    conn.commit()
-    conn.close()
-    return duration_minutes
+    inserted = 0
+    sessions = iter(sessions)
+    while True:
+        # 입력을 읽고 변환하는 동안에는 잠금을 잡지 않음
+        batch = []
+        for start_time, end_time, subject, felt_minutes in itertools.islice(sessions, batch_size):
+            duration_minutes, rate = compute_session_metrics(start_time, end_time, felt_minutes)
+            start_str = format_timestamp(start_time)
+            batch.append((
+                user_id, start_str, format_timestamp(end_time), subject,
+                duration_minutes, felt_minutes, rate,
+                user_id, start_str
+            ))
+        if not batch:
+            break
+        
+        with transaction(immediate=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM study_logs")
+            last_id = cursor.fetchone()[0]
+            before = conn.total_changes
+            cursor.executemany("""
+                INSERT INTO study_logs
+                    (user_id, start_time, end_time, subject, duration, felt_minutes, concentrate_rate)
+                SELECT ?, ?, ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM study_logs WHERE user_id = ? AND start_time = ?
+                )
+            """, batch)
+            added = conn.total_changes - before
+            # 모두 중복이었으면 집계는 건드리지 않음
+            if added:
+                _add_to_aggregates(cursor, user_id, last_id)
+        inserted += added
+    return inserted
 
 def cancel_study_session(session_id, user_id):
     """진행 중인 세션 취소 (삭제)"""
-    table_name = f"log_user_{user_id}"
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(f"DELETE FROM {table_name} WHERE id = ? AND end_time IS NULL", (session_id,))
-    deleted = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            DELETE FROM study_logs WHERE id = ? AND user_id = ? AND end_time IS NULL
+        """, (session_id, user_id))
+        # 완료 전이므로 일일 집계는 그대로
+        deleted = cursor.rowcount > 0
     return deleted
 
 def delete_study_log(user_id, log_id):
@@ -283,24 +866,30 @@ def delete_study_log(user_id, log_id):
     log_id = int(log_id)
     user_id = int(user_id)
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # 기록 삭제
-    cursor.execute("DELETE FROM study_logs WHERE id = ? AND user_id = ?", (log_id, user_id))
-    deleted = cursor.rowcount > 0
-    
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT start_time, end_time, subject, duration, concentrate_rate
+            FROM study_logs WHERE id = ? AND user_id = ?
+        """, (log_id, user_id))
+        row = cursor.fetchone()
+        
+        # 기록 삭제
+        cursor.execute("DELETE FROM study_logs WHERE id = ? AND user_id = ?", (log_id, user_id))
+        deleted = cursor.rowcount > 0
+        
+        # 완료된 기록이었다면 일일 집계에서 제외
+        if deleted and row[1] is not None:
+            _apply_to_aggregates(cursor, user_id, row[0], row[2], row[3], row[4], sign=-1)
     return deleted
 
 def get_user_tier(user_id):
     """사용자의 현재 티어 정보 조회"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT tier_index, rank_point FROM users WHERE id = ?", (user_id,))
-    result = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT tier_index, rank_point FROM users WHERE id = ?", (user_id,))
+        result = cursor.fetchone()
     if result:
         return {
             'tier_index': result[0],
@@ -308,76 +897,187 @@ def get_user_tier(user_id):
         }
     return None
 
+def user_state_version(user_id):
+    """사용자 정보가 바뀔 때마다 커지는 값 (기본 키로 정수 하나만 읽음, 없는 사용자면 None)"""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT state_version FROM users WHERE id = ?", (user_id,))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
 def update_user_tier(user_id, tier_index, rank_point):
     """사용자의 티어 정보 업데이트"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE users SET tier_index = ?, rank_point = ? WHERE id = ?",
-                   (tier_index, rank_point, user_id))
-    conn.commit()
-    conn.close()
+    update_user_tiers([(tier_index, rank_point, user_id)])
+
+def update_user_tiers(rows):
+    """여러 사용자의 티어 정보 일괄 업데이트
+    rows: (tier_index, rank_point, user_id) 목록
+    정산 트랜잭션 안에서 호출되어도 리더보드 캐시는 커밋된 뒤에 비움
+    """
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("""
+            UPDATE users SET tier_index = ?, rank_point = ?, state_version = state_version + 1
+            WHERE id = ?
+        """, rows)
+    after_commit(invalidate_leaderboard)
+
+def get_latest_settlement(user_id):
+    """사용자의 가장 최근 티어 정산 결과 조회"""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT day, minutes, tier_before, point_before, tier_after, point_after, message
+            FROM tier_settlements
+            WHERE user_id = ?
+            ORDER BY day DESC
+            LIMIT 1
+        """, (user_id,))
+        row = cursor.fetchone()
+    if row:
+        return {
+            'day': row[0],
+            'minutes': row[1],
+            'tier_before': row[2],
+            'point_before': row[3],
+            'tier_after': row[4],
+            'point_after': row[5],
+            'message': row[6]
+        }
+    return None
+
+# 리더보드 공유 캐시 (동시에 보는 사용자들이 같은 결과를 재사용)
+LEADERBOARD_CACHE_TTL = 5  # 초
+
+_leaderboard_cache = TTLCache(LEADERBOARD_CACHE_TTL)
+
+def invalidate_leaderboard():
+    """티어/점수가 바뀌었을 때 리더보드 캐시 비우기"""
+    _leaderboard_cache.clear()
+
+def _load_leaderboard(limit):
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, username, tier_index, rank_point
+            FROM users
+            ORDER BY rank_point DESC, id
+            LIMIT ?
+        """, (limit,))
+        rows = cursor.fetchall()
+    
+    # 동점자는 같은 순위 (1, 2, 2, 4 ...)
+    result = []
+    for position, (user_id, username, tier_index, rank_point) in enumerate(rows, start=1):
+        if result and result[-1]['rank_point'] == rank_point:
+            rank = result[-1]['rank']
+        else:
+            rank = position
+        result.append({
+            'rank': rank,
+            'user_id': user_id,
+            'username': username,
+            'tier_index': tier_index,
+            'rank_point': rank_point
+        })
+    return result
+
+def get_leaderboard(limit=50):
+    """점수 상위 limit명 (짧은 TTL 공유 캐시)"""
+    # 한 프로세스에서 DB_PATH를 바꿔 쓰는 경우(벤치마크 등) 다른 DB의 결과가 섞이지 않도록 경로도 키에 포함
+    return _leaderboard_cache.get_or_load((DB_PATH, 'top', limit), lambda: _load_leaderboard(limit))
+
+def _load_user_rank(user_id):
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT tier_index, rank_point FROM users WHERE id = ?", (user_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        tier_index, rank_point = row
+        # 인덱스 범위만 세면 되도록 점수 비교로 순위 계산
+        cursor.execute("SELECT COUNT(*) FROM users WHERE rank_point > ?", (rank_point,))
+        higher = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM users")
+        total = cursor.fetchone()[0]
+    return {
+        'rank': higher + 1,
+        'total_users': total,
+        'tier_index': tier_index,
+        'rank_point': rank_point
+    }
+
+def get_user_rank(user_id):
+    """사용자의 전체 순위 (짧은 TTL 공유 캐시)"""
+    return _leaderboard_cache.get_or_load((DB_PATH, 'rank', user_id), lambda: _load_user_rank(user_id))
 
 def get_database_stats():
     """데이터베이스 통계 조회 (관리용)"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # 전체 사용자 수
-    cursor.execute("SELECT COUNT(*) FROM users")
-    user_count = cursor.fetchone()[0]
-    
-    # 사용자별 로그 테이블 목록
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'log_user_%'")
-    log_tables = [row[0] for row in cursor.fetchall()]
+    with connection() as conn:
+        cursor = conn.cursor()
+        
+        # 전체 사용자 수
+        cursor.execute("SELECT COUNT(*) FROM users")
+        user_count = cursor.fetchone()[0]
+        
+        # 전체 기록 수 / 진행 중인 세션 수
+        cursor.execute("SELECT COUNT(*), COUNT(*) - COUNT(end_time) FROM study_logs")
+        log_count, active_count = cursor.fetchone()
     
     stats = {
         'total_users': user_count,
-        'log_tables': len(log_tables),
-        'table_names': log_tables
+        'total_logs': log_count,
+        'active_sessions': active_count
     }
-    
-    conn.close()
     return stats
 
+# 사용자 삭제 시 함께 지울 테이블 (user_id 컬럼 기준)
+USER_DATA_TABLES = [
+    "study_logs",
+    "daily_rollup",
+    "concentration_cube",
+    "subject_priorities",
+    "tier_settlements",
+]
+
 def cleanup_user_data(user_id):
     """사용자 데이터 완전 삭제 (GDPR 대응)"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # 사용자 로그 테이블 삭제
-    table_name = f"log_user_{user_id}"
-    cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
-    
-    # 사용자 계정 삭제
-    cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-    
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cursor = conn.cursor()
+        
+        # 사용자의 모든 기록/집계 삭제
+        for table in USER_DATA_TABLES:
+            cursor.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+        # 아직 옮기지 않은 예전 로그 테이블이 남아 있을 수 있음
+        cursor.execute(f"DROP TABLE IF EXISTS log_user_{int(user_id)}")
+        
+        # 사용자 계정 삭제
+        cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+    after_commit(invalidate_leaderboard)
 
 def get_subject_priorities(user_id):
     """과목 우선순위 조회"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # 과목별 평균 공부 시간 계산
-    cursor.execute('''
-    SELECT subject, AVG(duration) as avg_duration
-    FROM study_logs
-    WHERE user_id = ? AND duration IS NOT NULL
-    GROUP BY subject
-    ''', (user_id,))
-    
-    avg_durations = {row[0]: int(row[1]) for row in cursor.fetchall()}
-    
-    # 우선순위 조회
-    cursor.execute('''
-    SELECT subject, priority, target_minutes
-    FROM subject_priorities
-    WHERE user_id = ?
-    ''', (user_id,))
-    
-    priorities = cursor.fetchall()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        
+        # 과목별 평균 공부 시간 계산
+        cursor.execute('''
+        SELECT subject, AVG(duration) as avg_duration
+        FROM study_logs
+        WHERE user_id = ? AND duration IS NOT NULL
+        GROUP BY subject
+        ''', (user_id,))
+        
+        avg_durations = {row[0]: int(row[1]) for row in cursor.fetchall()}
+        
+        # 우선순위 조회
+        cursor.execute('''
+        SELECT subject, priority, target_minutes
+        FROM subject_priorities
+        WHERE user_id = ?
+        ''', (user_id,))
+        
+        priorities = cursor.fetchall()
     
     # 결과 정리
     result = {}
@@ -391,40 +1091,69 @@ def get_subject_priorities(user_id):
 
 def update_subject_priority(user_id, subject, priority, target_minutes):
     """과목 우선순위 업데이트"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    INSERT INTO subject_priorities (user_id, subject, priority, target_minutes)
-    VALUES (?, ?, ?, ?)
-    ON CONFLICT(user_id, subject) DO UPDATE SET
-        priority = excluded.priority,
-        target_minutes = excluded.target_minutes
-    ''', (user_id, subject, priority, target_minutes))
-    
-    conn.commit()
-    conn.close()
+    update_subject_priorities(user_id, [(subject, priority, target_minutes)])
 
-def get_subject_concentration_by_time(user_id):
-    """시간대별 과목 집중도 분석"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    SELECT 
-        subject,
-        strftime('%H', start_time) as hour,
-        AVG(concentrate_rate) as avg_concentration,
-        COUNT(*) as session_count
-    FROM study_logs
-    WHERE user_id = ? AND concentrate_rate IS NOT NULL
-    GROUP BY subject, hour
-    HAVING session_count >= 3  -- 최소 3회 이상의 기록이 있는 경우만
-    ORDER BY subject, hour
-    ''', (user_id,))
+def update_subject_priorities(user_id, rows):
+    """여러 과목의 우선순위를 한 트랜잭션으로 업데이트
+    rows: (subject, priority, target_minutes) 목록
+    """
+    if not rows:
+        return
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+        INSERT INTO subject_priorities (user_id, subject, priority, target_minutes)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(user_id, subject) DO UPDATE SET
+            priority = excluded.priority,
+            target_minutes = excluded.target_minutes
+        ''', [(user_id, subject, priority, target_minutes) for subject, priority, target_minutes in rows])
+
+# concentration_cube.weekday 번호 순서의 요일 이름
+WEEKDAY_NAMES = ['일', '월', '화', '수', '목', '금', '토']
+
+def _weekday_condition(weekdays):
+    """요일 필터 SQL 조각과 파라미터 (None이면 전체)"""
+    if not weekdays:
+        return "", []
+    weekdays = [int(day) for day in weekdays]
+    return f"AND weekday IN ({', '.join('?' * len(weekdays))})", weekdays
+
+def get_concentration_cube(user_id, weekdays=None):
+    """(과목, 요일, 시간)별 세션 수와 집중도 합계/제곱합 (집중도 큐브)"""
+    import pandas as pd
+    condition, params = _weekday_condition(weekdays)
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT subject, weekday, hour, session_count, rate_sum, rate_sumsq
+            FROM concentration_cube
+            WHERE user_id = ? {condition}
+            ORDER BY subject, weekday, hour
+        """, [user_id, *params])
+        rows = cursor.fetchall()
     
-    results = cursor.fetchall()
-    conn.close()
+    return pd.DataFrame(rows, columns=['subject', 'weekday', 'hour', 'session_count', 'rate_sum', 'rate_sumsq'])
+
+def get_subject_concentration_by_time(user_id, weekdays=None):
+    """시간대별 과목 집중도 분석 (weekdays: 포함할 요일 번호 목록, 0=일요일)"""
+    condition, params = _weekday_condition(weekdays)
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+        SELECT 
+            subject,
+            hour,
+            SUM(rate_sum) / SUM(session_count) as avg_concentration,
+            SUM(session_count) as session_count
+        FROM concentration_cube
+        WHERE user_id = ? {condition}
+        GROUP BY subject, hour
+        HAVING SUM(session_count) >= 3  -- 최소 3회 이상의 기록이 있는 경우만
+        ORDER BY subject, hour
+        ''', [user_id, *params])
+        
+        results = cursor.fetchall()
     
     # 결과 정리
     time_analysis = {}
@@ -439,26 +1168,196 @@ def get_subject_concentration_by_time(user_id):
     return time_analysis
 
 def get_daily_stats(user_id):
-    """일일 통계 조회"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
+    """일일 통계 조회 (완료된 세션 기준, 일일 집계 테이블 사용)"""
     today_str = date.today().isoformat()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT 
+                printf('%02d', hour) as hour,
+                SUM(session_count) as count,
+                SUM(minutes) * 1.0 / SUM(session_count) as avg_duration,
+                SUM(focus_sum) / SUM(session_count) as avg_rate
+            FROM daily_rollup
+            WHERE user_id = ? AND day = ?
+            GROUP BY hour
+            ORDER BY hour
+        """, (user_id, today_str))
+        
+        stats = cursor.fetchall()
     
-    cursor.execute("""
-        SELECT 
-            strftime('%H', start_time) as hour,
-            COUNT(*) as count,
-            AVG(duration) as avg_duration,
-            AVG(concentrate_rate) as avg_rate
-        FROM study_logs
-        WHERE user_id = ? 
-        AND date(start_time) = ?
-        GROUP BY hour
-        ORDER BY hour
-    """, (user_id, today_str))
+    return stats
+
+def get_log_totals(user_id):
+    """전체 기록 요약 (세션 수, 총 시간, 평균 시간, 평균 집중도)"""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM study_logs WHERE user_id = ?", (user_id,))
+        total_sessions = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT SUM(minutes), SUM(session_count), SUM(focus_sum)
+            FROM daily_rollup
+            WHERE user_id = ?
+        """, (user_id,))
+        minutes, finished, focus_sum = cursor.fetchone()
     
-    stats = cursor.fetchall()
-    conn.close()
+    return {
+        'total_sessions': total_sessions,
+        'finished_sessions': finished or 0,
+        'total_minutes': minutes or 0,
+        'avg_minutes': minutes / finished if finished else None,
+        'avg_concentration': focus_sum / finished if finished else None
+    }
+
+def get_logs_page(user_id, before=None, limit=50):
+    """기록 한 페이지 조회 (start_time, id 기준 키셋 페이지네이션)
+    before: 이전 페이지 마지막 행의 (start_time 문자열, id), None이면 첫 페이지
+    return: (DataFrame, 다음 페이지 커서 또는 None)
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        if before is None:
+            cursor.execute("""
+                SELECT id, start_time, end_time, subject, duration, felt_minutes, concentrate_rate
+                FROM study_logs
+                WHERE user_id = ?
+                ORDER BY start_time DESC, id DESC
+                LIMIT ?
+            """, (user_id, limit + 1))
+        else:
+            cursor.execute("""
+                SELECT id, start_time, end_time, subject, duration, felt_minutes, concentrate_rate
+                FROM study_logs
+                WHERE user_id = ? AND (start_time, id) < (?, ?)
+                ORDER BY start_time DESC, id DESC
+                LIMIT ?
+            """, (user_id, before[0], before[1], limit + 1))
+        rows = cursor.fetchall()
     
-    return stats 
\ No newline at end of file
+    # 한 행을 더 읽어서 다음 페이지 존재 여부 판단
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1][1], rows[-1][0])
+    return _logs_to_frame(rows), next_cursor
+
+def get_recent_logs(user_id, limit=10):
+    """최근 기록 limit개와 전체 기록 수 조회"""
+    recent_df, _ = get_logs_page(user_id, limit=limit)
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM study_logs WHERE user_id = ?", (user_id,))
+        total_count = cursor.fetchone()[0]
+    return recent_df, total_count
+
+def get_subject_summary(user_id):
+    """과목별 세션 수, 총/평균 시간, 평균 집중도 (완료된 세션 기준)"""
+    import pandas as pd
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT 
+                subject,
+                SUM(session_count) as session_count,
+                SUM(minutes) as total_minutes,
+                SUM(minutes) * 1.0 / SUM(session_count) as avg_minutes,
+                SUM(focus_sum) / SUM(session_count) as avg_concentration
+            FROM daily_rollup
+            WHERE user_id = ?
+            GROUP BY subject
+            ORDER BY subject
+        """, (user_id,))
+        rows = cursor.fetchall()
+    
+    return pd.DataFrame(rows, columns=[
+        'subject', 'session_count', 'total_minutes', 'avg_minutes', 'avg_concentration'
+    ]).set_index('subject')
+
+def get_daily_summary(user_id):
+    """날짜별 총 공부 시간과 세션 수 (완료된 세션 기준)"""
+    import pandas as pd
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT day, SUM(minutes), SUM(session_count)
+            FROM daily_rollup
+            WHERE user_id = ?
+            GROUP BY day
+            ORDER BY day
+        """, (user_id,))
+        rows = cursor.fetchall()
+    
+    df = pd.DataFrame(rows, columns=['day', 'total_minutes', 'session_count'])
+    df['day'] = pd.to_datetime(df['day']).dt.date
+    return df.set_index('day')
+
+def get_concentration_summary(user_id):
+    """과목별 집중도 통계 (세션 수, 평균, 표본 표준편차, 최저, 최고)"""
+    import pandas as pd
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT 
+                subject,
+                COUNT(concentrate_rate),
+                AVG(concentrate_rate),
+                SUM(concentrate_rate * concentrate_rate),
+                MIN(concentrate_rate),
+                MAX(concentrate_rate)
+            FROM study_logs
+            WHERE user_id = ? AND concentrate_rate IS NOT NULL
+            GROUP BY subject
+            ORDER BY subject
+        """, (user_id,))
+        rows = cursor.fetchall()
+    
+    result = []
+    for subject, count, mean, sum_sq, min_rate, max_rate in rows:
+        # 제곱합으로 표본 표준편차 계산 (세션 1개면 NaN)
+        std = float('nan')
+        if count > 1:
+            std = max(0.0, (sum_sq - count * mean * mean) / (count - 1)) ** 0.5
+        result.append((subject, count, mean, std, min_rate, max_rate))
+    
+    return pd.DataFrame(result, columns=[
+        'subject', 'count', 'mean', 'std', 'min', 'max'
+    ]).set_index('subject')
+
+# 집중도 구간 (하한 초과 ~ 상한 이하)
+FOCUS_RANGES = [
+    ('낮음(0-50%)', 0, 50),
+    ('보통(50-70%)', 50, 70),
+    ('좋음(70-85%)', 70, 85),
+    ('매우좋음(85-100%)', 85, 100),
+]
+
+def get_focus_range_counts(user_id):
+    """집중도 구간별 세션 수"""
+    import pandas as pd
+    cases = " ".join(
+        f"WHEN concentrate_rate <= {upper} THEN {index}"
+        for index, (_, _, upper) in enumerate(FOCUS_RANGES)
+    )
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT CASE {cases} END as bucket, COUNT(*)
+            FROM study_logs
+            WHERE user_id = ?
+            AND concentrate_rate > {FOCUS_RANGES[0][1]}
+            AND concentrate_rate <= {FOCUS_RANGES[-1][2]}
+            GROUP BY bucket
+        """, (user_id,))
+        counts = dict(cursor.fetchall())
+    
+    return pd.Series(
+        [counts.get(index, 0) for index in range(len(FOCUS_RANGES))],
+        index=[label for label, _, _ in FOCUS_RANGES]
+    )
+
+# 측정이 켜져 있으면(STUDY_INSTRUMENT=1) 공개 함수를 감싸서 호출 시간/행 수 기록
+instrument_namespace(globals(), exclude=(
+    "set_trace_callback", "get_pool", "connection", "transaction", "close_connections",
+    "format_timestamp", "parse_timestamp", "parse_timestamp_column", "safe_parse_datetime",
+    "user_state_version"
+))
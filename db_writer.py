@@ -0,0 +1,163 @@
+# db_writer.py
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from database import transaction
+
+logger = logging.getLogger(__name__)
+
+# 대기열에 쌓아 둘 수 있는 쓰기 수 (가득 차면 submit이 기다림)
+WRITE_QUEUE_SIZE = int(os.environ.get("STUDY_WRITE_QUEUE_SIZE", "1000"))
+# 한 트랜잭션에 묶을 최대 쓰기 수와 추가 쓰기를 기다리는 시간 (초)
+MAX_BATCH_WRITES = 64
+BATCH_WINDOW = 0.005
+# 대기열이 가득 찼을 때 기다리는 시간 / 결과를 기다리는 기본 시간 (초)
+SUBMIT_TIMEOUT = 10
+RESULT_TIMEOUT = 30
+
+class WriterBusyError(RuntimeError):
+    """쓰기 대기열이 가득 차서 요청을 받을 수 없음"""
+
+_STOP = object()
+
+class DatabaseWriter:
+    """
+    모든 쓰기를 한 스레드에서 순서대로 처리하는 단일 작성자
+    가까운 시점에 들어온 쓰기들을 짧은 트랜잭션 하나로 묶고,
+    쓰기마다 SAVEPOINT를 두어 하나가 실패해도 나머지는 커밋됨
+    """
+
+    def __init__(self, max_queue=WRITE_QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """func(*args, **kwargs)를 작성자 스레드에서 실행, 커밋 후 결과가 채워지는 Future 반환"""
+        future = Future()
+        # 쓰기 함수 안에서 다시 쓰기를 요청하면 기다리다 멈추므로 바로 실행
+        if threading.current_thread() is self._thread:
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        # 종료 이후에는 대기열에 넣지 않도록 잠금 안에서 확인과 추가를 함께 처리
+        with self._lock:
+            if self._stopped:
+                raise WriterBusyError("쓰기 작업자가 종료되었습니다")
+            try:
+                self._queue.put((future, func, args, kwargs), timeout=SUBMIT_TIMEOUT)
+            except queue.Full:
+                raise WriterBusyError("쓰기 대기열이 가득 찼습니다")
+        return future
+
+    def _next_batch(self):
+        """첫 쓰기를 기다린 뒤 BATCH_WINDOW 동안 들어온 쓰기를 함께 모음"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + BATCH_WINDOW
+        while len(batch) < MAX_BATCH_WRITES and batch[-1] is not _STOP:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is _STOP
+            items = [item for item in batch if item is not _STOP]
+            try:
+                if items:
+                    self._execute(items)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _execute(self, items):
+        """묶음 하나를 한 트랜잭션으로 실행하고 커밋 후 결과 전달"""
+        results = []
+        try:
+            with transaction(immediate=True) as conn:
+                for index, (future, func, args, kwargs) in enumerate(items):
+                    if not future.set_running_or_notify_cancel():
+                        results.append(None)
+                        continue
+                    savepoint = f"write_{index}"
+                    conn.execute(f"SAVEPOINT {savepoint}")
+                    try:
+                        results.append((True, func(*args, **kwargs)))
+                    except Exception as e:
+                        # 이 쓰기만 되돌리고 나머지는 계속
+                        conn.execute(f"ROLLBACK TO {savepoint}")
+                        results.append((False, e))
+                    conn.execute(f"RELEASE {savepoint}")
+        except Exception as e:
+            # 커밋 자체가 실패하면 묶음 전체 실패
+            logger.exception("쓰기 묶음 커밋 실패")
+            for future, _, _, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (future, _, _, _), outcome in zip(items, results):
+            if outcome is None:
+                continue
+            ok, value = outcome
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def flush(self, timeout=None):
+        """지금까지 들어온 쓰기가 모두 커밋될 때까지 대기
+        return: 시간 안에 끝났으면 True
+        """
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(lambda: self._queue.unfinished_tasks == 0, timeout)
+
+    def shutdown(self, timeout=RESULT_TIMEOUT):
+        """새 쓰기를 막고 대기 중인 쓰기를 모두 처리한 뒤 종료"""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("쓰기 작업자가 %s초 안에 끝나지 않았습니다", timeout)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """프로세스당 하나인 쓰기 작업자 (처음 호출 시 시작, 종료 시 남은 쓰기 처리)"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = DatabaseWriter()
+                atexit.register(_writer.shutdown)
+    return _writer
+
+def submit(func, *args, **kwargs):
+    """쓰기 함수를 대기열에 넣고 Future 반환"""
+    return get_writer().submit(func, *args, **kwargs)
+
+def write(func, *args, **kwargs):
+    """쓰기 함수를 대기열에 넣고 커밋될 때까지 기다려 결과 반환"""
+    return submit(func, *args, **kwargs).result(timeout=RESULT_TIMEOUT)
@@ -0,0 +1,148 @@
+# import_logs.py
+
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime
+from database import (
+    connection,
+    init_db,
+    insert_study_logs,
+    IMPORT_BATCH_SIZE,
+)
+
+# 파일에 있어야 하는 열
+FIELDS = ("start_time", "end_time", "subject", "felt_minutes")
+
+class InvalidRowError(ValueError):
+    """잘못된 행 (strict 모드에서 가져오기 중단)"""
+
+def _read_records(path):
+    """CSV 또는 JSONL에서 (줄 번호, dict)를 하나씩 읽기 (파일 전체를 메모리에 올리지 않음)
+    CSV: 첫 줄은 start_time,end_time,subject,felt_minutes 헤더
+    JSONL: {"start_time": ..., "end_time": ..., "subject": ..., "felt_minutes": ...}
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".jsonl"):
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield line_no, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield line_no, e
+        else:
+            reader = csv.DictReader(f)
+            missing = [field for field in FIELDS if field not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"CSV 헤더에 없는 열: {', '.join(missing)}")
+            for row in reader:
+                yield reader.line_num, row
+
+def _parse_time(value):
+    """ISO 형식 시각 (시간대가 있으면 로컬 시각으로 변환)"""
+    dt = datetime.fromisoformat(str(value).strip())
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt.replace(microsecond=0)
+
+def validate_record(record, now=None):
+    """한 행 검사 후 (start_time, end_time, subject, felt_minutes) 반환, 잘못되면 ValueError"""
+    if isinstance(record, Exception):
+        raise ValueError(f"JSON 형식 오류: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("객체 형식이 아닙니다")
+    missing = [field for field in ("start_time", "end_time", "felt_minutes") if record.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"빈 값: {', '.join(missing)}")
+
+    try:
+        start_time = _parse_time(record["start_time"])
+        end_time = _parse_time(record["end_time"])
+    except ValueError:
+        raise ValueError(f"시각 형식 오류: {record['start_time']} ~ {record['end_time']}")
+    if end_time <= start_time:
+        raise ValueError("종료 시각이 시작 시각보다 빠르거나 같습니다")
+    if end_time > (now or datetime.now()):
+        raise ValueError("미래의 기록입니다")
+
+    try:
+        felt_minutes = int(float(record["felt_minutes"]))
+    except (TypeError, ValueError):
+        raise ValueError(f"체감 시간 형식 오류: {record['felt_minutes']}")
+    if felt_minutes < 0:
+        raise ValueError("체감 시간이 음수입니다")
+
+    subject = str(record.get("subject") or "").strip()
+    return start_time, end_time, subject, felt_minutes
+
+def import_logs(user_id, path, strict=False, batch_size=IMPORT_BATCH_SIZE):
+    """
+    파일의 공부 기록을 사용자에게 추가
+    strict=True면 잘못된 행이 하나라도 있을 때 아무것도 저장하지 않음
+    (묶음마다 따로 커밋하므로 저장하기 전에 파일 전체를 한 번 검사)
+    return: {'inserted': 저장한 행 수, 'skipped': 중복으로 건너뛴 행 수, 'errors': [(줄 번호, 사유)]}
+    """
+    errors = []
+    valid = 0
+    now = datetime.now()
+
+    if strict:
+        for line_no, record in _read_records(path):
+            try:
+                validate_record(record, now)
+            except ValueError as e:
+                raise InvalidRowError(f"{line_no}번째 줄: {e}")
+
+    def sessions():
+        nonlocal valid
+        for line_no, record in _read_records(path):
+            try:
+                session = validate_record(record, now)
+            except ValueError as e:
+                if strict:
+                    raise InvalidRowError(f"{line_no}번째 줄: {e}")
+                errors.append((line_no, str(e)))
+                continue
+            valid += 1
+            yield session
+
+    inserted = insert_study_logs(user_id, sessions(), batch_size)
+    return {'inserted': inserted, 'skipped': valid - inserted, 'errors': errors}
+
+def _resolve_user(username):
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+def main():
+    parser = argparse.ArgumentParser(description="과거 공부 기록 가져오기 (CSV 또는 JSONL)")
+    parser.add_argument("file", help="CSV(start_time,end_time,subject,felt_minutes 헤더) 또는 .jsonl 파일")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--user", help="아이디")
+    group.add_argument("--user-id", type=int, help="사용자 번호")
+    parser.add_argument("--strict", action="store_true", help="잘못된 행이 있으면 아무것도 저장하지 않음")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    user_id = args.user_id if args.user_id is not None else _resolve_user(args.user)
+    if user_id is None:
+        parser.error(f"존재하지 않는 아이디입니다: {args.user}")
+
+    try:
+        result = import_logs(user_id, args.file, args.strict, args.batch_size)
+    except ValueError as e:
+        print(f"❌ 가져오기 실패: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"✅ {result['inserted']}개 저장, 중복 {result['skipped']}개 건너뜀, 오류 {len(result['errors'])}개")
+    for line_no, reason in result['errors'][:20]:
+        print(f"  - {line_no}번째 줄: {reason}", file=sys.stderr)
+    if len(result['errors']) > 20:
+        print(f"  ... 외 {len(result['errors']) - 20}개", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
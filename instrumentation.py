@@ -0,0 +1,284 @@
+# instrumentation.py
+
+import collections
+import functools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 환경 변수로 켜고 끔 (꺼져 있으면 함수 감싸기/SQL 측정을 아예 하지 않음)
+ENABLED = os.environ.get("STUDY_INSTRUMENT", "0") == "1"
+SLOW_QUERY_MS = float(os.environ.get("STUDY_SLOW_QUERY_MS", "100"))
+METRICS_FILE = os.environ.get("STUDY_METRICS_FILE", "metrics.prom")
+METRICS_INTERVAL = float(os.environ.get("STUDY_METRICS_INTERVAL", "15"))
+
+# 지연 시간 히스토그램 구간 (초)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 보관할 느린 쿼리 수
+SLOW_QUERY_HISTORY = 100
+
+class Histogram:
+    """호출 수, 합계, 구간별 개수, 반환 행 수"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.rows = 0
+
+    def observe(self, seconds, rows=None):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for i, upper in enumerate(BUCKETS):
+            if seconds <= upper:
+                self.buckets[i] += 1
+                break
+        if rows is not None:
+            self.rows += rows
+
+    def quantile(self, q):
+        """구간 안에서 선형 보간한 분위수 (초, 관측한 최댓값을 넘지 않음)"""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        lower = 0.0
+        for upper, n in zip(BUCKETS, self.buckets):
+            if n and seen + n >= target:
+                value = lower + (upper - lower) * (target - seen) / n
+                return min(value, self.max)
+            seen += n
+            lower = upper
+        return self.max
+
+_lock = threading.Lock()
+_functions = collections.defaultdict(Histogram)   # "모듈.함수" -> Histogram
+_sql = Histogram()
+_slow_queries = collections.deque(maxlen=SLOW_QUERY_HISTORY)
+
+def _count_rows(result):
+    """반환값에서 행 수 추정 (알 수 없으면 None)"""
+    if result is None:
+        return 0
+    if isinstance(result, dict):
+        return 1
+    if isinstance(result, tuple):
+        # (DataFrame, 커서) 같은 반환은 첫 값 기준, 그 외 튜플은 DB 한 행
+        first = result[0] if result else None
+        return len(first) if hasattr(first, "columns") else 1
+    if hasattr(result, "__len__") and not isinstance(result, (str, bytes)):
+        return len(result)
+    return None
+
+def instrument(func, name):
+    """함수 호출 시간/횟수/반환 행 수를 기록하도록 감싸기"""
+    if getattr(func, "__instrumented__", False):
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            with _lock:
+                _functions[name].observe(elapsed, _count_rows(result))
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+def instrument_namespace(namespace, prefix=None, only_prefix=None, exclude=()):
+    """
+    모듈(또는 페이지 스크립트)의 globals()에 정의된 함수를 측정용으로 교체
+    only_prefix: 이 접두사로 시작하는 함수만 (예: "render_")
+    exclude: 감싸지 않을 함수 이름
+    꺼져 있으면 아무것도 하지 않음
+    """
+    if not ENABLED:
+        return
+    module_name = namespace.get("__name__")
+    prefix = prefix or module_name
+    for attr, value in list(namespace.items()):
+        if not callable(value) or not hasattr(value, "__code__"):
+            continue
+        if getattr(value, "__module__", None) != module_name or attr.startswith("_"):
+            continue
+        if only_prefix and not attr.startswith(only_prefix):
+            continue
+        if attr in exclude:
+            continue
+        namespace[attr] = instrument(value, f"{prefix}.{attr}")
+    start_exporter()
+
+# --- SQL 측정 ---
+
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+def _record_sql(cursor, sql, params, seconds):
+    with _lock:
+        _sql.observe(seconds)
+    if seconds * 1000 < SLOW_QUERY_MS:
+        return
+
+    plan = []
+    if sql.lstrip().upper().startswith(_EXPLAINABLE):
+        try:
+            # 측정 대상이 아닌 기본 커서로 실행 (재귀 측정 방지)
+            explain = sqlite3.Cursor(cursor.connection)
+            sqlite3.Cursor.execute(explain, "EXPLAIN QUERY PLAN " + sql, params)
+            plan = [row[-1] for row in explain.fetchall()]
+        except sqlite3.Error as e:
+            plan = [f"(EXPLAIN 실패: {e})"]
+
+    entry = {
+        'time': datetime.now().isoformat(timespec="seconds"),
+        'ms': round(seconds * 1000, 2),
+        'sql': " ".join(sql.split()),
+        'plan': plan
+    }
+    with _lock:
+        _slow_queries.append(entry)
+    logger.warning("느린 쿼리 %.1fms: %s | %s", entry['ms'], entry['sql'], " / ".join(plan))
+
+class TimedCursor(sqlite3.Cursor):
+    """execute/executemany 시간을 측정하는 커서"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_sql(self, sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            # 여러 행 파라미터로는 EXPLAIN할 수 없으므로 시간만 기록
+            with _lock:
+                _sql.observe(time.perf_counter() - start)
+
+class TimedConnection(sqlite3.Connection):
+    """모든 커서를 TimedCursor로 만드는 커넥션"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def connection_factory():
+    """sqlite3.connect(factory=...)에 넘길 커넥션 클래스"""
+    return TimedConnection if ENABLED else sqlite3.Connection
+
+# --- 조회/내보내기 ---
+
+def snapshot():
+    """현재까지의 측정값 (진단 페이지용)"""
+    with _lock:
+        functions = {
+            name: {
+                'calls': h.count,
+                'total_ms': round(h.total * 1000, 2),
+                'mean_ms': round(h.total * 1000 / h.count, 3) if h.count else 0.0,
+                'p50_ms': round(h.quantile(0.5) * 1000, 3),
+                'p95_ms': round(h.quantile(0.95) * 1000, 3),
+                'max_ms': round(h.max * 1000, 3),
+                'rows': h.rows
+            }
+            for name, h in _functions.items()
+        }
+        return {
+            'enabled': ENABLED,
+            'slow_query_ms': SLOW_QUERY_MS,
+            'functions': functions,
+            'sql': {
+                'statements': _sql.count,
+                'total_ms': round(_sql.total * 1000, 2),
+                'p95_ms': round(_sql.quantile(0.95) * 1000, 3)
+            },
+            'slow_queries': list(_slow_queries)
+        }
+
+def _histogram_lines(metric, labels, h):
+    """labels: 'function="..."' 형식 (없으면 빈 문자열)"""
+    base = f"{{{labels}}}" if labels else ""
+    prefix = f"{labels}," if labels else ""
+    lines = []
+    cumulative = 0
+    for upper, n in zip(BUCKETS, h.buckets):
+        cumulative += n
+        lines.append(f'{metric}_bucket{{{prefix}le="{upper}"}} {cumulative}')
+    lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {h.count}')
+    lines.append(f"{metric}_sum{base} {h.total}")
+    lines.append(f"{metric}_count{base} {h.count}")
+    return lines
+
+def render_prometheus():
+    """Prometheus 텍스트 형식으로 변환"""
+    lines = [
+        "# HELP study_function_duration_seconds 함수 호출 시간",
+        "# TYPE study_function_duration_seconds histogram",
+    ]
+    with _lock:
+        for name in sorted(_functions):
+            lines += _histogram_lines("study_function_duration_seconds", f'function="{name}"', _functions[name])
+        lines += [
+            "# HELP study_function_rows_total 함수가 반환한 행 수",
+            "# TYPE study_function_rows_total counter",
+        ]
+        for name in sorted(_functions):
+            lines.append(f'study_function_rows_total{{function="{name}"}} {_functions[name].rows}')
+        lines += [
+            "# HELP study_sql_duration_seconds SQL 문 실행 시간",
+            "# TYPE study_sql_duration_seconds histogram",
+        ]
+        lines += _histogram_lines("study_sql_duration_seconds", "", _sql)
+        lines += [
+            "# HELP study_slow_queries_recent 보관 중인 느린 쿼리 수",
+            "# TYPE study_slow_queries_recent gauge",
+            f"study_slow_queries_recent {len(_slow_queries)}",
+        ]
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path=METRICS_FILE):
+    """측정값을 파일로 저장 (임시 파일에 쓴 뒤 교체)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+_exporter_lock = threading.Lock()
+_exporter_thread = None
+
+def _exporter_loop():
+    while True:
+        time.sleep(METRICS_INTERVAL)
+        try:
+            write_prometheus()
+        except OSError:
+            logger.exception("측정값 파일 저장 실패")
+
+def start_exporter():
+    """측정값 파일을 주기적으로 저장하는 스레드 시작 (프로세스당 한 번)"""
+    global _exporter_thread
+    if not ENABLED:
+        return
+    with _exporter_lock:
+        if _exporter_thread is None:
+            _exporter_thread = threading.Thread(target=_exporter_loop, name="metrics-exporter", daemon=True)
+            _exporter_thread.start()
@@ -1,3 +1,4 @@
+import os
 import streamlit as st
 
 # 페이지 설정 (반드시 첫 번째 Streamlit 명령어여야 함)
@@ -5,15 +6,19 @@ st.set_page_config(page_title="공부 시스템", layout="centered")
 
 from database import init_db
 from auth import render_login_signup, logout, is_logged_in, init_session_state
-from utils import render_user_info, update_daily_tier_progress
-from study_timer import render_study_timer
-from analytics import render_recent_logs#, render_analytics_tabs
+# from analytics import render_analytics_tabs
 # from pages.time_analysis import render_time_analysis
 # from pages.subject_recommender import render_subject_recommender
 
 # 앱 초기화
 init_db()
 
+# 일일 티어 정산 스케줄러는 run.py(런처)가 한 프로세스에서만 돌림
+# streamlit run main.py로 직접 실행할 때만 STUDY_SCHEDULER=1로 켬 (벤치마크/테스트에서는 꺼져 있음)
+if os.environ.get("STUDY_SCHEDULER") == "1":
+    from settlement import start_scheduler
+    start_scheduler()
+
 # 세션 상태 초기화 (한 번만 실행)
 init_session_state()
 
@@ -25,13 +30,17 @@ if not is_logged_in():
     st.stop()
 
 # 2) 로그인된 사용자 화면
-# 일일 티어 진행도 업데이트 (하루에 한 번만)
-if not st.session_state.today_flag:
-    update_daily_tier_progress()
+# 화면 모듈(PIL/numpy/pandas를 씀)은 로그인한 뒤에만 불러옴 (로그인 화면은 가볍게)
+from utils import render_user_info, render_settlement_notice
+from study_timer import render_study_timer
+from analytics import render_recent_logs
 
 # 사용자 정보 + 티어 이미지 표시
 render_user_info()
 
+# 최근 일일 티어 정산 결과 (세션당 한 번)
+render_settlement_notice()
+
 st.markdown("---")
 
 # 3) 공부 타이머
@@ -55,6 +64,8 @@ if st.button("⏰ 시간대별 분석", use_container_width=True):
     st.switch_page("pages/time_analysis.py")
 if st.button("📚 과목별 시간 추천", use_container_width=True):
     st.switch_page("pages/subject_recommender.py")
+if st.button("🏆 리더보드", use_container_width=True):
+    st.switch_page("pages/leaderboard.py")
 
 # 로그아웃
 if st.button("🚪 로그아웃"):
@@ -1,4 +1,5 @@
 import streamlit as st
+from instrumentation import instrument_namespace
 from analytics import render_analytics_tabs
 
 def render_analytics():
@@ -7,6 +8,8 @@ def render_analytics():
     render_analytics_tabs()
 
 
+# 측정이 켜져 있으면 화면 그리는 함수의 호출 시간 기록
+instrument_namespace(globals(), prefix="pages.analytics", only_prefix="render_")
 render_analytics()
 st.markdown("---")
 if st.button("🏠 메인 페이지", use_container_width=True):
@@ -0,0 +1,73 @@
+import os
+import streamlit as st
+import pandas as pd
+import database
+import instrumentation
+
+# 진단 페이지를 볼 수 있는 아이디 (쉼표 구분)
+ADMIN_USERS = {name.strip() for name in os.environ.get("STUDY_ADMIN_USERS", "").split(",") if name.strip()}
+
+def render_diagnostics():
+    """함수별 호출 시간, 느린 쿼리, 캐시 상태 (관리자 전용)"""
+    st.markdown("# 🩺 진단")
+    st.markdown("---")
+
+    if st.session_state.get("username") not in ADMIN_USERS:
+        st.error("관리자만 볼 수 있는 페이지입니다.")
+        st.stop()
+
+    data = instrumentation.snapshot()
+    if not data['enabled']:
+        st.info("측정이 꺼져 있습니다. STUDY_INSTRUMENT=1로 실행하면 기록됩니다.")
+
+    # SQL 전체
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("SQL 실행 수", data['sql']['statements'])
+    with col2:
+        st.metric("SQL 총 시간", f"{data['sql']['total_ms']:.0f}ms")
+    with col3:
+        st.metric("SQL p95", f"{data['sql']['p95_ms']}ms")
+
+    # 함수별
+    st.subheader("함수별 호출 시간")
+    if data['functions']:
+        table = pd.DataFrame.from_dict(data['functions'], orient='index')
+        table = table.sort_values('total_ms', ascending=False).rename(columns={
+            'calls': '호출 수',
+            'total_ms': '총 시간(ms)',
+            'mean_ms': '평균(ms)',
+            'p50_ms': 'p50(ms)',
+            'p95_ms': 'p95(ms)',
+            'max_ms': '최대(ms)',
+            'rows': '반환 행 수'
+        })
+        st.dataframe(table, use_container_width=True)
+    else:
+        st.write("기록된 호출이 없습니다.")
+
+    # 느린 쿼리
+    st.subheader(f"느린 쿼리 ({data['slow_query_ms']:.0f}ms 이상)")
+    if data['slow_queries']:
+        for entry in reversed(data['slow_queries']):
+            with st.expander(f"{entry['time']} · {entry['ms']}ms · {entry['sql'][:80]}"):
+                st.code(entry['sql'], language="sql")
+                st.text("\n".join(entry['plan']) or "(실행 계획 없음)")
+    else:
+        st.write("느린 쿼리가 없습니다.")
+
+    # 캐시
+    st.subheader("캐시")
+    st.json({'leaderboard': database._leaderboard_cache.stats()})
+
+    st.download_button(
+        "📥 Prometheus 형식으로 받기",
+        instrumentation.render_prometheus(),
+        file_name="metrics.prom",
+        mime="text/plain"
+    )
+
+render_diagnostics()
+st.markdown("---")
+if st.button("🏠 메인 페이지", use_container_width=True):
+    st.switch_page("main.py")
@@ -0,0 +1,56 @@
+import streamlit as st
+from instrumentation import instrument_namespace
+import pandas as pd
+from database import get_leaderboard, get_user_rank
+from tier_logic import Tier
+from utils import get_tier_image_filename
+from assets import tier_image_uri, LEADERBOARD_SIZE as ICON_SIZE
+
+# 리더보드에 표시할 인원
+LEADERBOARD_SIZE = 50
+
+def render_leaderboard():
+    """전체 순위 페이지"""
+    st.markdown("# 🏆 리더보드")
+    st.markdown("---")
+    
+    # 내 순위
+    my_rank = get_user_rank(st.session_state.user_id)
+    if my_rank:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("내 순위", f"{my_rank['rank']}위 / {my_rank['total_users']}명")
+        with col2:
+            st.metric("티어", Tier[my_rank['tier_index']])
+        with col3:
+            st.metric("점수", f"{my_rank['rank_point']}점")
+    
+    # 상위 N명
+    st.markdown(f"### 상위 {LEADERBOARD_SIZE}명")
+    leaders = get_leaderboard(LEADERBOARD_SIZE)
+    if not leaders:
+        st.write("아직 사용자가 없습니다.")
+        return
+    
+    table = pd.DataFrame([{
+        '순위': leader['rank'],
+        '아이디': leader['username'],
+        ' ': tier_image_uri(get_tier_image_filename(Tier[leader['tier_index']]), ICON_SIZE),
+        '티어': Tier[leader['tier_index']],
+        '점수': leader['rank_point']
+    } for leader in leaders])
+    st.dataframe(
+        table,
+        hide_index=True,
+        use_container_width=True,
+        column_config={' ': st.column_config.ImageColumn(width="small")}
+    )
+
+# 측정이 켜져 있으면 화면 그리는 함수의 호출 시간 기록
+instrument_namespace(globals(), prefix="pages.leaderboard", only_prefix="render_")
+render_leaderboard()
+st.markdown("---")
+if st.button("🏠 메인 페이지", use_container_width=True):
+    st.switch_page("main.py")
+if st.button("📊 상세 분석", use_container_width=True):
+    st.switch_page("pages/analytics.py")
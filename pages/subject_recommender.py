@@ -1,11 +1,17 @@
 import streamlit as st
+from instrumentation import instrument_namespace
 import pandas as pd
 from database import (
-    get_user_logs,
+    get_subject_summary,
     get_subject_priorities,
-    update_subject_priority,
-    get_subject_concentration_by_time
+    update_subject_priorities,
+    get_subject_concentration_by_time,
+    WEEKDAY_NAMES
 )
+from db_writer import write
+
+# 목표 시간 입력 범위
+TARGET_MIN, TARGET_MAX = 10, 240
 
 def render_subject_recommender():
     """과목 추천 시스템 UI"""
@@ -15,26 +21,30 @@ def render_subject_recommender():
     # 1. 과목 우선순위 설정
     st.markdown("### 1️⃣ 과목 우선순위 설정")
     
-    # 과목별 통계 데이터 가져오기
-    df = get_user_logs(st.session_state.user_id)
-    if df.empty:
+    # 과목별 통계 데이터 가져오기 (일일 집계 테이블)
+    summary = get_subject_summary(st.session_state.user_id)
+    if summary.empty:
         st.warning("아직 공부 기록이 없습니다.")
         return
     
-    # 과목별 평균 시간 계산
-    subject_stats = df.groupby('subject').agg({
-        'duration': ['mean', 'count']
-    }).round(2)
-    subject_stats.columns = ['평균 시간(분)', '기록 수']
+    # 과목별 평균 시간
+    subject_stats = pd.DataFrame({
+        '평균 시간(분)': summary['avg_minutes'].round(2),
+        '기록 수': summary['session_count']
+    })
     
     # 현재 우선순위 가져오기
     priorities = get_subject_priorities(st.session_state.user_id)
     
+    # 자동 저장이 꺼져 있으면 저장 버튼을 눌렀을 때만 기록
+    auto_save = st.toggle("변경 즉시 저장", value=True, key="priority_auto_save")
+    
     # 과목들을 3개씩 그룹화
     subjects = list(subject_stats.index)
     subject_groups = [subjects[i:i+3] for i in range(0, len(subjects), 3)]
     
     # 우선순위 설정 UI
+    changes = []
     for group in subject_groups:
         cols = st.columns(3)
         for i, subject in enumerate(group):
@@ -42,40 +52,58 @@ def render_subject_recommender():
                 st.write(f"**{subject}**")
                 avg_time = int(subject_stats.loc[subject, '평균 시간(분)'])
                 st.write(f"평균: {avg_time}분")
-                avg_time = max(10, avg_time)
+                
+                # 저장된 값이 있으면 그 값을, 없으면 기본값(우선순위 1, 평균 시간)을 표시
+                saved = priorities.get(subject)
+                default_priority = saved['priority'] if saved else 1
+                default_target = saved['target_minutes'] if saved else avg_time
+                default_target = min(TARGET_MAX, max(TARGET_MIN, int(default_target)))
                 
                 priority = st.number_input(
                     "우선순위",
                     min_value=1,
                     max_value=10,
-                    value=priorities.get(subject, {}).get('priority', 1),
+                    value=default_priority,
                     key=f"priority_{subject}"
                 )
                 
                 target_minutes = st.number_input(
                     "목표 시간(분)",
-                    min_value=10,  # 최소값 10분으로 낮춤
-                    max_value=240,
+                    min_value=TARGET_MIN,  # 최소값 10분으로 낮춤
+                    max_value=TARGET_MAX,
                     step=10,  # 10분 단위로 변경
-                    value=avg_time,  # 기본값을 평균 시간으로 설정
+                    value=default_target,  # 기본값은 저장된 목표 또는 평균 시간
                     key=f"target_{subject}"
                 )
                 
-                # 우선순위 업데이트
-                update_subject_priority(
-                    st.session_state.user_id,
-                    subject,
-                    priority,
-                    target_minutes
-                )
+                # 저장된 값(없으면 기본값)과 다를 때만 저장 대상
+                if (priority, target_minutes) != (default_priority, default_target):
+                    changes.append((subject, priority, target_minutes))
         
         st.markdown("---")
     
+    # 바뀐 과목만 한 번에 저장
+    if changes and (auto_save or st.button(f"💾 변경사항 저장 ({len(changes)}개 과목)")):
+        write(update_subject_priorities, st.session_state.user_id, changes)
+        for subject, priority, target_minutes in changes:
+            priorities[subject] = {'priority': priority, 'target_minutes': target_minutes}
+        if not auto_save:
+            st.success("✅ 저장되었습니다.")
+    elif changes:
+        st.info(f"저장하지 않은 변경사항이 {len(changes)}개 과목에 있습니다.")
+    
     # 2. 시간대별 추천
     st.markdown("### 2️⃣ 시간대별 추천")
     
-    # 시간대별 집중도 분석
-    time_analysis = get_subject_concentration_by_time(st.session_state.user_id)
+    # 시간대별 집중도 분석 (선택한 요일만)
+    selected_days = st.multiselect(
+        "요일",
+        options=list(range(7)),
+        default=list(range(7)),
+        format_func=lambda day: WEEKDAY_NAMES[day],
+        help="모두 지우면 전체 요일"
+    )
+    time_analysis = get_subject_concentration_by_time(st.session_state.user_id, selected_days)
     
     if not time_analysis:
         st.warning("시간대별 분석을 위한 충분한 데이터가 없습니다.")
@@ -140,6 +168,8 @@ def render_subject_recommender():
     # 표로 출력
     st.table(pd.DataFrame(concentration_data))
 
+# 측정이 켜져 있으면 화면 그리는 함수의 호출 시간 기록
+instrument_namespace(globals(), prefix="pages.subject_recommender", only_prefix="render_")
 render_subject_recommender()
 
 st.markdown("---")
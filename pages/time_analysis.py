@@ -1,33 +1,43 @@
 import streamlit as st
+from instrumentation import instrument_namespace
 import pandas as pd
 from datetime import time
-from database import get_user_logs, safe_parse_datetime
+from database import get_concentration_cube, WEEKDAY_NAMES
 
 
 
+def render_weekday_heatmap(cube):
+    """요일 × 시간 평균 집중도 표"""
+    grouped = cube.groupby(['weekday', 'hour'])[['session_count', 'rate_sum']].sum()
+    heatmap = (grouped['rate_sum'] / grouped['session_count']).round(1).unstack('hour')
+    heatmap.index = [WEEKDAY_NAMES[day] for day in heatmap.index]
+    heatmap.columns = [f"{hour:02d}시" for hour in heatmap.columns]
+    st.dataframe(heatmap, use_container_width=True)
+
 def render_time_analysis():
     """시간대별 분석 페이지"""
     st.title("⏰ 시간대별 분석")
     
-    # 데이터 로드
-    df = get_user_logs(st.session_state.user_id)
-    if df.empty:
+    # 요일 선택 (집중도 큐브에서 바로 조회)
+    selected_days = st.multiselect(
+        "요일",
+        options=list(range(7)),
+        default=list(range(7)),
+        format_func=lambda day: WEEKDAY_NAMES[day],
+        help="모두 지우면 전체 요일"
+    )
+    cube = get_concentration_cube(st.session_state.user_id, selected_days)
+    if cube.empty:
         st.info("아직 공부 기록이 없습니다.")
         return
     
-    # 시간 형식 변환
-    df['start_time'] = df['start_time'].apply(safe_parse_datetime)
-    
-    # 시간대별 통계
-    df['hour'] = df['start_time'].dt.hour
-    hourly_stats = df.groupby('hour').agg({
-        'duration': ['count', 'mean'],
-        'concentrate_rate': 'mean'
-    }).round(2)
-    
     st.markdown("# ⏰ 시간대별 분석")
     st.markdown("---")
     
+    st.markdown("### 📅 요일 × 시간 평균 집중도(%)")
+    render_weekday_heatmap(cube)
+    st.markdown("---")
+    
     # 1. 시간대 설정
     st.markdown("### 1️⃣ 시간대 설정")
     
@@ -73,20 +83,20 @@ def render_time_analysis():
     for slot in st.session_state.time_slots:
         st.subheader(f"📊 {slot['name']} 분석")
         
-        # 해당 시간대의 데이터 필터링
-        mask = (df['start_time'].dt.hour >= slot['start'].hour) & (df['start_time'].dt.hour <= slot['end'].hour)
-        time_slot_df = df[mask].copy()
+        # 해당 시간대의 칸만 선택
+        mask = (cube['hour'] >= slot['start'].hour) & (cube['hour'] <= slot['end'].hour)
+        time_slot_cube = cube[mask]
         
-        if time_slot_df.empty:
+        if time_slot_cube.empty:
             st.write("이 시간대의 기록이 없습니다.")
             continue
         
-        # 과목별 집중도 평균 계산
-        subject_stats = time_slot_df.groupby('subject').agg({
-            'concentrate_rate': ['mean', 'count']
-        }).round(2)
-        
-        subject_stats.columns = ['평균 집중도', '기록 수']
+        # 과목별 집중도 평균 계산 (합계 / 세션 수)
+        totals = time_slot_cube.groupby('subject')[['rate_sum', 'session_count']].sum()
+        subject_stats = pd.DataFrame({
+            '평균 집중도': (totals['rate_sum'] / totals['session_count']).round(2),
+            '기록 수': totals['session_count']
+        })
         subject_stats = subject_stats.sort_values('평균 집중도', ascending=False)
         
         # 결과 표시
@@ -96,6 +106,8 @@ def render_time_analysis():
         # 시각화 (Streamlit 기본 차트 사용)
         st.bar_chart(subject_stats['평균 집중도'])
 
+# 측정이 켜져 있으면 화면 그리는 함수의 호출 시간 기록
+instrument_namespace(globals(), prefix="pages.time_analysis", only_prefix="render_")
 render_time_analysis()
 st.markdown("---")
 if st.button("🏠 메인 페이지", use_container_width=True):
@@ -0,0 +1,107 @@
+# passwords.py
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# PBKDF2 반복 횟수 (클수록 느리고 안전, 바꾸면 다음 로그인 때 새 값으로 다시 저장됨)
+PASSWORD_ITERATIONS = int(os.environ.get("STUDY_PASSWORD_ITERATIONS", "600000"))
+# 동시에 해시를 계산하는 스레드 수 (hashlib이 계산 중 GIL을 놓으므로 다른 사용자의 화면은 멈추지 않음)
+PASSWORD_WORKERS = int(os.environ.get("STUDY_PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+# 계산 중이거나 기다리는 요청의 최대 수 / 자리가 나기를 기다리는 시간 (초)
+PASSWORD_QUEUE_SIZE = int(os.environ.get("STUDY_PASSWORD_QUEUE_SIZE", "64"))
+SUBMIT_TIMEOUT = 10
+
+ALGORITHM = "pbkdf2_sha256"
+SALT_BYTES = 16
+
+class LoginBusyError(RuntimeError):
+    """로그인 요청이 너무 많아 지금은 처리할 수 없음"""
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+def _derive(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+def hash_password(password, iterations=None):
+    """저장용 해시 ("pbkdf2_sha256$반복횟수$salt$해시")"""
+    iterations = iterations or PASSWORD_ITERATIONS
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f"{ALGORITHM}${iterations}${_b64(salt)}${_b64(_derive(password, salt, iterations))}"
+
+def verify_password(password, stored):
+    """
+    비밀번호 확인
+    return: (일치 여부, 다시 저장할 해시 또는 None)
+    예전 평문 비밀번호이거나 반복 횟수가 현재 설정과 다르면 일치할 때 새 해시를 함께 반환
+    """
+    if not stored.startswith(ALGORITHM + "$"):
+        # 해시로 바꾸기 전의 평문 비밀번호
+        if hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8")):
+            return True, hash_password(password)
+        return False, None
+
+    try:
+        _, iterations, salt, expected = stored.split("$")
+        iterations = int(iterations)
+        salt = base64.b64decode(salt)
+        expected = base64.b64decode(expected)
+    except ValueError:
+        return False, None
+    if not hmac.compare_digest(_derive(password, salt, iterations), expected):
+        return False, None
+    if iterations != PASSWORD_ITERATIONS:
+        return True, hash_password(password)
+    return True, None
+
+# 없는 아이디도 같은 시간이 걸리도록 비교에 쓰는 salt와 해시
+# (어떤 비밀번호와도 맞지 않는 임의의 값이라 미리 계산할 필요 없이 불러올 때 만들어 둠)
+_dummy_salt = secrets.token_bytes(SALT_BYTES)
+_dummy_digest = secrets.token_bytes(hashlib.sha256().digest_size)
+
+def verify_missing_user(password):
+    """없는 아이디로 로그인할 때도 해시를 한 번 계산 (응답 시간으로 아이디 존재 여부를 알 수 없게)"""
+    dummy = f"{ALGORITHM}${PASSWORD_ITERATIONS}${_b64(_dummy_salt)}${_b64(_dummy_digest)}"
+    verify_password(password, dummy)
+    return False, None
+
+# --- 스레드 풀 ---
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_QUEUE_SIZE)
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="password")
+    return _executor
+
+def _run(func, *args):
+    """func를 해시 스레드에서 실행하고 결과를 기다림 (자리가 없으면 LoginBusyError)"""
+    if not _slots.acquire(timeout=SUBMIT_TIMEOUT):
+        raise LoginBusyError("로그인 요청이 많습니다. 잠시 후 다시 시도해 주세요.")
+    try:
+        future = _get_executor().submit(func, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result()
+
+def check_password(password, stored):
+    """verify_password를 해시 스레드에서 실행 (stored가 None이면 없는 아이디)"""
+    if stored is None:
+        return _run(verify_missing_user, password)
+    return _run(verify_password, password, stored)
+
+def make_password_hash(password):
+    """hash_password를 해시 스레드에서 실행"""
+    return _run(hash_password, password)
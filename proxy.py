@@ -0,0 +1,188 @@
+# proxy.py
+
+import asyncio
+import itertools
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 브라우저를 같은 워커로 계속 보내기 위한 쿠키 (웹소켓 세션, 업로드/미디어 파일이 워커 메모리에 있음)
+STICKY_COOKIE = "study_worker"
+# 요청 헤더 최대 크기 / 워커 연결 대기 시간 (초) / 한 번에 옮기는 바이트 수
+MAX_HEADER_BYTES = 64 * 1024
+CONNECT_TIMEOUT = 5
+BUFFER_SIZE = 64 * 1024
+
+# 요청마다 워커를 고를 수 있도록 일반 HTTP 요청은 연결을 재사용하지 않게 함
+_HOP_BY_HOP = {"connection", "keep-alive", "proxy-connection"}
+
+def _parse_head(head):
+    """요청/응답 헤더 바이트 -> (첫 줄, [(이름, 값)])"""
+    lines = head.decode("latin-1").split("\r\n")
+    headers = []
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, _, value = line.partition(":")
+        headers.append((name.strip(), value.strip()))
+    return lines[0], headers
+
+def _build_head(first_line, headers):
+    lines = [first_line] + [f"{name}: {value}" for name, value in headers]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+def _sticky_index(headers):
+    """Cookie 헤더에서 워커 번호 (없거나 잘못되었으면 None)"""
+    for name, value in headers:
+        if name.lower() != "cookie":
+            continue
+        for part in value.split(";"):
+            key, _, cookie_value = part.strip().partition("=")
+            if key == STICKY_COOKIE and cookie_value.isdigit():
+                return int(cookie_value)
+    return None
+
+def _is_websocket(headers):
+    return any(name.lower() == "upgrade" and value.lower() == "websocket" for name, value in headers)
+
+def _error_response(status, message):
+    body = message.encode("utf-8")
+    return (
+        f"HTTP/1.1 {status}\r\n"
+        "Content-Type: text/plain; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("latin-1") + body
+
+async def _pipe(reader, writer, half_close=False):
+    """reader에서 읽은 바이트를 그대로 writer로 (끝나면 half_close면 쓰기 쪽만 닫음)"""
+    try:
+        while True:
+            data = await reader.read(BUFFER_SIZE)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+        if half_close and writer.can_write_eof():
+            writer.write_eof()
+    except (ConnectionError, OSError):
+        pass
+
+class StickyProxy:
+    """
+    여러 Streamlit 워커 앞에 두는 리버스 프록시
+    처음 온 브라우저는 연결이 가장 적은 워커에 배정하고 쿠키로 기억해서
+    이후의 요청과 웹소켓이 같은 워커로 가게 함 (워커가 죽으면 다른 워커로 다시 배정)
+    """
+
+    def __init__(self, backends, is_available, backend_host="127.0.0.1"):
+        """
+        backends: {워커 번호: 포트}
+        is_available: 워커 번호 -> 요청을 보내도 되는지
+        """
+        self.backends = dict(backends)
+        self.is_available = is_available
+        self.backend_host = backend_host
+        self.active = {index: 0 for index in self.backends}
+        self._rotation = itertools.count()
+        self._loop = None
+        self._server = None
+
+    def _candidates(self, preferred):
+        """연결을 시도할 워커 순서 (쿠키의 워커 -> 연결이 적은 워커)"""
+        available = [index for index in sorted(self.backends) if self.is_available(index)]
+        if preferred in available:
+            available.remove(preferred)
+            return [preferred] + available
+        # 연결 수가 같으면 돌아가며 배정
+        offset = next(self._rotation) % len(available) if available else 0
+        rotated = available[offset:] + available[:offset]
+        return sorted(rotated, key=lambda index: self.active[index])
+
+    async def _connect(self, preferred):
+        """워커에 연결 (실패하면 다음 워커) return: (번호, reader, writer) 또는 None"""
+        for index in self._candidates(preferred):
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.backend_host, self.backends[index], limit=MAX_HEADER_BYTES),
+                    CONNECT_TIMEOUT
+                )
+                return index, reader, writer
+            except (OSError, asyncio.TimeoutError):
+                logger.warning("워커 %s(포트 %s)에 연결할 수 없습니다", index, self.backends[index])
+        return None
+
+    async def handle(self, client_reader, client_writer):
+        backend_writer = None
+        index = None
+        try:
+            try:
+                head = await client_reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                return
+            first_line, headers = _parse_head(head)
+            preferred = _sticky_index(headers)
+
+            connected = await self._connect(preferred)
+            if connected is None:
+                client_writer.write(_error_response("503 Service Unavailable", "서버를 준비 중입니다. 잠시 후 새로고침해 주세요."))
+                await client_writer.drain()
+                return
+            index, backend_reader, backend_writer = connected
+            self.active[index] += 1
+
+            if not _is_websocket(headers):
+                headers = [(name, value) for name, value in headers if name.lower() not in _HOP_BY_HOP]
+                headers.append(("Connection", "close"))
+            backend_writer.write(_build_head(first_line, headers))
+            await backend_writer.drain()
+
+            # 처음 배정했거나 다른 워커로 옮겼으면 응답에 쿠키 추가
+            if index != preferred:
+                response_head = await backend_reader.readuntil(b"\r\n\r\n")
+                status_line, response_headers = _parse_head(response_head)
+                response_headers.append(("Set-Cookie", f"{STICKY_COOKIE}={index}; Path=/; HttpOnly; SameSite=Lax"))
+                client_writer.write(_build_head(status_line, response_headers))
+                await client_writer.drain()
+
+            upstream = asyncio.create_task(_pipe(client_reader, backend_writer, half_close=True))
+            await _pipe(backend_reader, client_writer)
+            upstream.cancel()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, OSError):
+            pass
+        finally:
+            if index is not None:
+                self.active[index] -= 1
+            for writer in (backend_writer, client_writer):
+                if writer is not None:
+                    writer.close()
+
+    def start(self, host, port):
+        """별도 스레드의 이벤트 루프에서 프록시 시작 (포트를 열지 못하면 예외)"""
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._server = self._loop.run_until_complete(
+                    asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+                )
+            except OSError as e:
+                errors.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name="proxy", daemon=True).start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+
+    def stop(self):
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
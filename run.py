@@ -1,13 +1,42 @@
 # run.py
 
+import argparse
+import collections
+import logging
+import signal
 import socket
 import subprocess
 import sys
 import os
+import threading
 import time
+import urllib.request
 import webbrowser
+from logging.handlers import RotatingFileHandler
+from proxy import StickyProxy
 
-def find_free_port(start=8501, end=8600):
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 워커 수 (Streamlit은 한 프로세스에서 모든 세션을 돌리므로 여러 개 띄워 나눔)
+DEFAULT_WORKERS = int(os.environ.get("STUDY_WORKERS", str(min(4, os.cpu_count() or 1))))
+# 워커 상태를 확인하는 간격 (초)
+WATCH_INTERVAL = 1
+# 워커가 이 시간(초)보다 빨리 죽으면 다시 띄우기 전에 기다리는 시간을 두 배로 늘림 (최대 MAX_RESTART_DELAY)
+STABLE_SECONDS = 30
+MIN_RESTART_DELAY = 1
+MAX_RESTART_DELAY = 60
+# 준비 확인: /_stcore/health를 처음엔 자주, 점점 간격을 늘려 가며 확인 (초)
+READY_TIMEOUT = 60
+READY_INITIAL_DELAY = 0.05
+READY_MAX_DELAY = 1.0
+# 워커 출력 로그 (크기가 넘으면 새 파일로 교체, 예전 파일은 LOG_BACKUPS개까지 보관)
+LOG_DIR = os.environ.get("STUDY_LOG_DIR", os.path.join(ROOT, "logs"))
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+# 워커가 죽었을 때 보여 줄 마지막 출력 줄 수
+TAIL_LINES = 20
+
+def find_free_port(start=8501, end=8600, host="0.0.0.0"):
     """
     start부터 end까지 순서대로 사용 가능한 포트를 찾아 반환.
     모두 사용 중이면 None 반환.
@@ -15,12 +44,28 @@ def find_free_port(start=8501, end=8600):
     for port in range(start, end + 1):
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             try:
-                s.bind(("0.0.0.0", port))
+                s.bind((host, port))
                 return port
             except OSError:
                 continue
     return None
 
+def find_free_ports(count, start=8502, end=8600, host="127.0.0.1"):
+    """
+    start부터 end 사이에서 연속으로 비어 있는 포트 count개를 찾아 목록으로 반환.
+    찾지 못하면 None 반환.
+    """
+    port = start
+    while port + count - 1 <= end:
+        for offset in range(count):
+            if find_free_port(port + offset, port + offset, host) is None:
+                # 사용 중인 포트 다음부터 다시 찾기
+                port += offset + 1
+                break
+        else:
+            return list(range(port, port + count))
+    return None
+
 def get_local_ip():
     """
     외부로 나가는 UDP 소켓을 8.8.8.8:80에 연결해보면서
@@ -35,41 +80,266 @@ def get_local_ip():
         # 문제가 생긴다면 fallback으로 localhost 리턴
         return "127.0.0.1"
 
+def streamlit_command(port, address):
+    return [
+        sys.executable, "-m", "streamlit", "run", os.path.join(ROOT, "main.py"),
+        "--server.address", address,
+        "--server.port", str(port),
+        "--server.headless", "true",
+        "--logger.level", "debug",
+        "--server.enableCORS", "false",
+        "--server.enableXsrfProtection", "false"
+    ]
+
+class Worker:
+    """Streamlit 프로세스 하나 (죽으면 같은 포트로 다시 띄움)"""
+
+    def __init__(self, index, port, address):
+        self.index = index
+        self.port = port
+        self.address = address
+        self.process = None
+        self.started_at = None
+        self.restarts = 0
+        self.restart_delay = MIN_RESTART_DELAY
+        self.restart_at = None
+        self.logger = _worker_logger(index)
+        self.log_path = self.logger.handlers[0].baseFilename
+        self.tail = collections.deque(maxlen=TAIL_LINES)
+        self.ready_event = threading.Event()
+        self.startup = None      # 마지막 시작의 준비 시간 측정값
+        self._drain_threads = []
+        self._ready_thread = None
+
+    def start(self):
+        # 티어 정산은 런처에서만 (워커마다 돌면 같은 확인을 워커 수만큼 반복)
+        env = dict(os.environ, STUDY_WORKER_INDEX=str(self.index), STUDY_SCHEDULER="0")
+        # 측정값 파일이 워커끼리 겹치지 않도록
+        env.setdefault("STUDY_METRICS_FILE", "metrics.prom")
+        root, ext = os.path.splitext(env["STUDY_METRICS_FILE"])
+        env["STUDY_METRICS_FILE"] = f"{root}.worker{self.index}{ext}"
+        self.ready_event.clear()
+        self.startup = None
+        self.tail.clear()
+        self.started_at = time.monotonic()
+        self.process = subprocess.Popen(
+            streamlit_command(self.port, self.address),
+            cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self.restart_at = None
+        # 출력을 계속 읽어 주지 않으면 파이프가 가득 차서 워커가 멈춤
+        self._drain_threads = [
+            threading.Thread(target=self._drain, args=(self.process.stdout, "stdout"), daemon=True),
+            threading.Thread(target=self._drain, args=(self.process.stderr, "stderr"), daemon=True),
+        ]
+        self._ready_thread = threading.Thread(target=self._wait_ready, args=(self.process,), daemon=True)
+        for thread in self._drain_threads + [self._ready_thread]:
+            thread.start()
+
+    def _drain(self, stream, name):
+        """자식 프로세스 출력을 한 줄씩 로그 파일로"""
+        for raw in iter(stream.readline, b""):
+            line = raw.decode("utf-8", "replace").rstrip()
+            self.logger.info("[%s] %s", name, line)
+            self.tail.append(line)
+        stream.close()
+
+    def _wait_ready(self, process):
+        """헬스 체크가 성공할 때까지 간격을 늘려 가며 확인하고 걸린 시간 기록"""
+        result = wait_until_ready(self.port, process)
+        # 그 사이 다시 시작되었으면 이전 프로세스의 결과는 버림
+        if process is not self.process:
+            return
+        self.startup = dict(result, restart=self.restarts)
+        if result['ready']:
+            self.ready_event.set()
+            self.logger.info("[launcher] 준비 완료 %.2f초 (확인 %d회)", result['seconds'], result['polls'])
+            if self.restarts:
+                print(f"🔁 워커 {self.index}(포트 {self.port}) 다시 준비됨: {result['seconds']:.2f}초 "
+                      f"(재시작 {self.restarts}회)")
+        else:
+            self.logger.info("[launcher] 준비되지 않음 %.2f초 (확인 %d회)", result['seconds'], result['polls'])
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def ready(self):
+        """요청을 보내도 되는지 (살아 있고 헬스 체크 통과)"""
+        return self.alive and self.ready_event.is_set()
+
+    def wait_checked(self, timeout=None):
+        """이번 시작의 준비 확인이 끝날 때까지 대기 (성공 여부는 ready로 확인)"""
+        if self._ready_thread is not None:
+            self._ready_thread.join(timeout)
+
+    def last_output(self):
+        """종료된 프로세스의 마지막 출력 (출력을 다 읽을 때까지 잠시 기다림)"""
+        for thread in self._drain_threads:
+            thread.join(timeout=2)
+        return "\n".join(self.tail)
+
+    def check(self):
+        """죽었으면 기다린 뒤 다시 띄움 (곧바로 다시 죽으면 기다리는 시간을 늘림)
+        살아 있어도 READY_TIMEOUT 안에 헬스 체크를 통과하지 못했으면 종료시켜 다시 띄움
+        """
+        if self.alive:
+            if self.startup is not None and not self.startup['ready']:
+                print(f"⚠️ 워커 {self.index}(포트 {self.port})가 {READY_TIMEOUT}초 안에 준비되지 않아 종료합니다.")
+                self.stop()
+            else:
+                return
+        now = time.monotonic()
+        if self.restart_at is None:
+            output = self.last_output()
+            uptime = now - self.started_at
+            if uptime < STABLE_SECONDS:
+                self.restart_delay = min(self.restart_delay * 2, MAX_RESTART_DELAY)
+            else:
+                self.restart_delay = MIN_RESTART_DELAY
+            self.restart_at = now + self.restart_delay
+            print(f"⚠️ 워커 {self.index}(포트 {self.port})가 종료되었습니다 (코드 {self.process.returncode}). "
+                  f"{self.restart_delay}초 후 다시 시작합니다. (로그: {self.log_path})")
+            if output:
+                print(output)
+        if now >= self.restart_at:
+            self.restarts += 1
+            self.start()
+
+    def stop(self):
+        if self.alive:
+            self.process.terminate()
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+def _worker_logger(index):
+    """워커별 로그 파일 (크기 기준으로 교체)"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logger = logging.getLogger(f"run.worker{index}")
+    if not logger.handlers:
+        handler = RotatingFileHandler(
+            os.path.join(LOG_DIR, f"worker{index}.log"),
+            maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+def wait_until_ready(port, process=None, timeout=READY_TIMEOUT):
+    """
+    Streamlit 헬스 체크(/_stcore/health)가 성공할 때까지 대기
+    처음에는 READY_INITIAL_DELAY 간격으로, 실패할 때마다 1.5배씩 (최대 READY_MAX_DELAY)
+    process가 먼저 종료되면 바로 포기
+    return: {'ready': 성공 여부, 'seconds': 걸린 시간, 'polls': 확인 횟수}
+    """
+    url = f"http://127.0.0.1:{port}/_stcore/health"
+    start = time.monotonic()
+    delay = READY_INITIAL_DELAY
+    polls = 0
+    while True:
+        polls += 1
+        try:
+            with urllib.request.urlopen(url, timeout=READY_MAX_DELAY) as response:
+                if response.status == 200:
+                    return {'ready': True, 'seconds': time.monotonic() - start, 'polls': polls}
+        except OSError:
+            pass
+        if process is not None and process.poll() is not None:
+            break
+        if time.monotonic() - start + delay > timeout:
+            break
+        time.sleep(delay)
+        delay = min(delay * 1.5, READY_MAX_DELAY)
+    return {'ready': False, 'seconds': time.monotonic() - start, 'polls': polls}
+
+def prepare_database():
+    """워커들이 동시에 마이그레이션을 기다리지 않도록 스키마를 먼저 준비"""
+    from database import init_db, close_connections
+    init_db()
+    close_connections()
+
+def start_settlement():
+    """일일 티어 정산 스케줄러를 런처 프로세스에서 시작 (워커 수와 관계없이 하나만)"""
+    from settlement import start_scheduler
+    start_scheduler()
+
 def main():
-    python_cmd = sys.executable  # python 실행 경로 (예: C:\Users\LG\AppData\Local\…\python.exe)
+    launch_start = time.monotonic()
+    # 런처에서 도는 정산 스케줄러와 프록시의 로그를 콘솔로
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+    parser = argparse.ArgumentParser(description="공부 타이머 서버 실행")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Streamlit 워커 수 (2개 이상이면 앞에 프록시를 둠)")
+    args = parser.parse_args()
+    worker_count = max(1, args.workers)
 
-    # 1) 사용 가능한 포트 찾기
+    # 1) 사용 가능한 포트 찾기 (접속용 포트 + 워커별 내부 포트)
     port = find_free_port(8501, 8600)
     if port is None:
         print("❌ 8501-8600 포트 중 비어 있는 포트를 찾을 수 없습니다.")
         return
+    if worker_count == 1:
+        # 워커가 하나면 프록시 없이 바로 접속
+        workers = [Worker(0, port, "0.0.0.0")]
+    else:
+        worker_ports = find_free_ports(worker_count, port + 1, 8700)
+        if worker_ports is None:
+            print(f"❌ 워커 {worker_count}개에 쓸 연속된 빈 포트를 찾을 수 없습니다.")
+            return
+        workers = [Worker(i, worker_port, "127.0.0.1") for i, worker_port in enumerate(worker_ports)]
 
     # 2) Streamlit 서버 실행 (백그라운드)
-    cmd = [
-        python_cmd, "-m", "streamlit", "run", "main.py",
-        "--server.address", "0.0.0.0",
-        "--server.port", str(port),
-        "--server.headless", "true",
-        "--logger.level", "debug",
-        "--server.enableCORS", "false",
-        "--server.enableXsrfProtection", "false"
-    ]
+    db_start = time.monotonic()
+    prepare_database()
+    db_seconds = time.monotonic() - db_start
+    start_settlement()
     try:
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        for worker in workers:
+            worker.start()
     except Exception as e:
         print("❌ Streamlit 실행 중 오류 발생:", e)
+        for worker in workers:
+            worker.stop()
         return
 
-    # 3) 잠깐 대기한 후 (Streamlit 서버가 켜질 시간을 줌)
-    time.sleep(2)
+    proxy = None
+    if worker_count > 1:
+        proxy = StickyProxy(
+            {worker.index: worker.port for worker in workers},
+            lambda index: workers[index].ready
+        )
+        try:
+            proxy.start("0.0.0.0", port)
+        except OSError as e:
+            print(f"❌ 프록시를 {port}번 포트에서 시작할 수 없습니다:", e)
+            for worker in workers:
+                worker.stop()
+            return
+
+    # 3) 워커가 실제로 요청을 받을 수 있을 때까지 대기 (헬스 체크)
+    deadline = time.monotonic() + READY_TIMEOUT
+    for worker in workers:
+        worker.wait_checked(max(0, deadline - time.monotonic()))
+    ready_seconds = time.monotonic() - launch_start
 
     # 프로세스 상태 확인
-    if process.poll() is not None:
-        # 프로세스가 이미 종료됨
-        stdout, stderr = process.communicate()
-        print("❌ Streamlit 프로세스가 종료되었습니다.")
-        print("STDOUT:", stdout.decode('utf-8'))
-        print("STDERR:", stderr.decode('utf-8'))
+    if not any(worker.ready for worker in workers):
+        # 준비된 워커가 하나도 없음
+        print("❌ Streamlit 서버가 준비되지 않았습니다.")
+        for worker in workers:
+            print(f"--- 워커 {worker.index} (로그: {worker.log_path})")
+            print(worker.last_output())
+        if proxy:
+            proxy.stop()
+        for worker in workers:
+            worker.stop()
         return
 
     # 4) 로컬 및 네트워크 URL 계산
@@ -82,6 +352,14 @@ def main():
     print(f"✅ Streamlit 앱이 실행 중입니다.")
     print(f"   로컬 접속:     {local_url}")
     print(f"   네트워크 접속: {network_url}")
+    print(f"   준비 시간:     {ready_seconds:.2f}초 (DB 준비 {db_seconds:.2f}초)")
+    for worker in workers:
+        if worker.ready:
+            print(f"   워커 {worker.index} (포트 {worker.port}): {worker.startup['seconds']:.2f}초, "
+                  f"헬스 체크 {worker.startup['polls']}회")
+        else:
+            print(f"   워커 {worker.index} (포트 {worker.port}): 준비되지 않음, 감시 중 다시 시작")
+    print(f"   로그: {LOG_DIR}")
     print("───────────────────────────────────\n")
 
     # 6) 기본 브라우저로 네트워크 URL 열기
@@ -91,13 +369,21 @@ def main():
         print('브라우저 열기 실패')
         pass
 
-    # 7) 프로세스가 종료될 때까지 대기
+    # 7) 종료될 때까지 워커 감시 (죽은 워커는 다시 시작)
+    # kill 등으로 종료 신호를 받아도 Ctrl+C처럼 워커를 정리하고 끝냄
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
     try:
-        process.wait()
+        while True:
+            time.sleep(WATCH_INTERVAL)
+            for worker in workers:
+                worker.check()
     except KeyboardInterrupt:
         print("\n🛑 실행 중단. Streamlit 서버를 종료합니다.")
-        process.terminate()
-        process.wait()
+    finally:
+        if proxy:
+            proxy.stop()
+        for worker in workers:
+            worker.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,82 @@
+# session_token.py
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+
+# 서명 키: 환경 변수가 없으면 파일에 만들어 두고 계속 사용 (여러 프로세스가 같은 키를 씀)
+SECRET_ENV = "STUDY_SESSION_SECRET"
+SECRET_FILE = os.environ.get("STUDY_SESSION_SECRET_FILE", ".session_secret")
+# 토큰 유효 기간 (초)
+TOKEN_MAX_AGE = int(os.environ.get("STUDY_SESSION_DAYS", "30")) * 24 * 3600
+
+_TOKEN_VERSION = "v1"
+_secret = None
+_secret_lock = threading.Lock()
+
+def _load_secret():
+    """환경 변수의 키, 없으면 키 파일 (처음이면 새로 만듦)"""
+    value = os.environ.get(SECRET_ENV)
+    if value:
+        return value.encode()
+    try:
+        # 다른 프로세스와 동시에 만들더라도 한 쪽만 성공하도록 O_EXCL 사용
+        fd = os.open(SECRET_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(SECRET_FILE, "rb") as f:
+            value = f.read().strip()
+        # 만드는 중인 파일을 읽었으면 잠시 후 다시 읽기
+        while not value:
+            time.sleep(0.01)
+            with open(SECRET_FILE, "rb") as f:
+                value = f.read().strip()
+        return value
+    value = secrets.token_hex(32).encode()
+    with os.fdopen(fd, "wb") as f:
+        f.write(value)
+    return value
+
+def _get_secret():
+    global _secret
+    if _secret is None:
+        with _secret_lock:
+            if _secret is None:
+                _secret = _load_secret()
+    return _secret
+
+def _sign(payload):
+    digest = hmac.new(_get_secret(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+def issue_token(user_id, epoch, now=None):
+    """
+    로그인 토큰 생성 ("v1.사용자.세대.발급시각.서명")
+    epoch: users.session_epoch (로그아웃하면 증가해서 이전 토큰이 모두 무효가 됨)
+    """
+    issued_at = int(now if now is not None else time.time())
+    payload = f"{_TOKEN_VERSION}.{int(user_id)}.{int(epoch)}.{issued_at}"
+    return f"{payload}.{_sign(payload)}"
+
+def verify_token(token, now=None):
+    """서명과 유효 기간 확인
+    return: (user_id, epoch), 잘못되었거나 만료되었으면 None
+    """
+    if not isinstance(token, str):
+        return None
+    payload, _, signature = token.rpartition(".")
+    parts = payload.split(".")
+    if len(parts) != 4 or parts[0] != _TOKEN_VERSION:
+        return None
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        user_id, epoch, issued_at = (int(part) for part in parts[1:])
+    except ValueError:
+        return None
+    if (now if now is not None else time.time()) - issued_at > TOKEN_MAX_AGE:
+        return None
+    return user_id, epoch
@@ -0,0 +1,241 @@
+# settlement.py
+
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from database import (
+    connection,
+    transaction,
+    update_user_tiers,
+    init_db,
+    format_timestamp,
+)
+
+logger = logging.getLogger(__name__)
+
+# 밀린 정산을 최대 며칠 전까지 따라잡을지 (정산 뒤 기록이 바뀐 날도 이 기간 안에서만 다시 정산)
+MAX_CATCH_UP_DAYS = 30
+# 하루가 끝나고 이 시간(시간)이 지난 뒤 정산 (자정을 넘겨 진행 중인 세션은 시작한 날로 집계되므로 끝날 때까지 기다림)
+SETTLEMENT_GRACE_HOURS = float(os.environ.get("STUDY_SETTLEMENT_GRACE_HOURS", "3"))
+# 스케줄러가 깨어나는 최대 간격 (초)
+SCHEDULER_INTERVAL = 3600
+
+def settle_day(day):
+    """
+    하루치 티어 정산 (전체 사용자를 한 번에 계산해서 일괄 반영)
+    이미 정산 기록이 있는 사용자와 그날 이후에 가입한 사용자는 건너뛰므로 여러 번 실행해도 결과가 같음
+    return: 이번에 정산한 사용자 수
+    """
+    # numpy를 쓰므로 필요할 때 import (쓰기 잠금을 잡기 전에)
+    from tier_simulation import simulate_tiers
+    day_str = day.isoformat()
+    # 여러 프로세스가 동시에 실행해도 한쪽만 정산하도록 처음부터 쓰기 잠금
+    with transaction(immediate=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT u.id, u.tier_index, u.rank_point, COALESCE(r.minutes, 0)
+            FROM users u
+            LEFT JOIN (
+                SELECT user_id, SUM(minutes) AS minutes
+                FROM daily_rollup
+                WHERE day = ?
+                GROUP BY user_id
+            ) r ON r.user_id = u.id
+            WHERE (u.created_day IS NULL OR u.created_day <= ?)
+            AND NOT EXISTS (
+                SELECT 1 FROM tier_settlements s
+                WHERE s.user_id = u.id AND s.day = ?
+            )
+        """, (day_str, day_str, day_str))
+        rows = cursor.fetchall()
+        if not rows:
+            return 0
+
+        user_ids = [row[0] for row in rows]
+        ranks = [row[1] or 0 for row in rows]
+        points = [row[2] or 0 for row in rows]
+        minutes = [[max(0, int(row[3]))] for row in rows]
+        result = simulate_tiers(ranks, points, minutes, with_messages=True)
+
+        new_ranks = result['rank'].tolist()
+        new_points = result['rank_point'].tolist()
+        update_user_tiers(list(zip(new_ranks, new_points, user_ids)))
+
+        settled_at = format_timestamp(datetime.now())
+        cursor.executemany("""
+            INSERT INTO tier_settlements
+                (user_id, day, minutes, tier_before, point_before, tier_after, point_after, message, settled_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (user_ids[i], day_str, minutes[i][0], ranks[i], points[i],
+             new_ranks[i], new_points[i], result['messages'][i][0], settled_at)
+            for i in range(len(rows))
+        ])
+    return len(rows)
+
+# 정산 기록 중 지금 집계와 공부 시간이 다른 날 (날짜 인덱스로 기간 안의 기록만 읽음)
+_CHANGED_DAYS_SQL = """
+    SELECT s.user_id, s.day
+    FROM tier_settlements s
+    WHERE s.day >= ?
+    AND s.minutes != MAX(0, COALESCE((
+        SELECT SUM(r.minutes) FROM daily_rollup r
+        WHERE r.user_id = s.user_id AND r.day = s.day
+    ), 0))
+"""
+
+def _changed_users(since_str):
+    """다시 정산해야 하는 사용자와 바뀐 첫 날 {user_id: day} (쓰기 잠금 없이 읽기만)"""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_CHANGED_DAYS_SQL, (since_str,))
+        first_days = {}
+        for user_id, day in cursor.fetchall():
+            first_days[user_id] = min(day, first_days.get(user_id, day))
+    return first_days
+
+def resettle_changed(since):
+    """
+    정산한 뒤 공부 시간이 바뀐 날(유예 시간보다 길게 이어진 세션, 나중에 가져온 기록 등)을 다시 정산
+    바뀐 날부터 그 사용자의 마지막 정산일까지 정산 기록을 순서대로 다시 계산해 덮어씀
+    바뀐 날은 잠금 없이 먼저 찾고, 있을 때만 쓰기 잠금을 잡은 뒤 그 사용자들의 기록을 다시 확인
+    since: 이 날짜 이후의 정산 기록만 확인
+    return: 다시 정산한 사용자 수
+    """
+    candidates = _changed_users(since.isoformat())
+    if not candidates:
+        return 0
+
+    from tier_simulation import simulate_tiers
+    with transaction(immediate=True) as conn:
+        cursor = conn.cursor()
+        user_ids, histories = [], []
+        for user_id, first_day in sorted(candidates.items()):
+            cursor.execute("""
+                SELECT s.day, s.tier_before, s.point_before, MAX(0, COALESCE((
+                    SELECT SUM(r.minutes) FROM daily_rollup r
+                    WHERE r.user_id = s.user_id AND r.day = s.day
+                ), 0)), s.minutes
+                FROM tier_settlements s
+                WHERE s.user_id = ? AND s.day >= ?
+                ORDER BY s.day
+            """, (user_id, first_day))
+            history = cursor.fetchall()
+            # 잠금을 기다리는 동안 다른 프로세스가 이미 다시 정산했으면 바뀐 날이 없거나 더 뒤로 밀림
+            changed = [i for i, row in enumerate(history) if row[3] != row[4]]
+            if not changed:
+                continue
+            user_ids.append(user_id)
+            histories.append(history[changed[0]:])
+        if not user_ids:
+            return 0
+
+        # 사용자마다 다시 계산할 날 수가 다르므로 짧은 쪽은 mask로 건너뜀
+        n_days = max(len(history) for history in histories)
+        ranks = [history[0][1] for history in histories]
+        points = [history[0][2] for history in histories]
+        minutes = [[row[3] for row in history] + [0] * (n_days - len(history)) for history in histories]
+        mask = [[True] * len(history) + [False] * (n_days - len(history)) for history in histories]
+        result = simulate_tiers(ranks, points, minutes, mask=mask, with_messages=True)
+
+        settled_at = format_timestamp(datetime.now())
+        updates = []
+        for i, history in enumerate(histories):
+            tier_before, point_before = ranks[i], points[i]
+            for j, row in enumerate(history):
+                tier_after = int(result['rank_history'][i, j])
+                point_after = int(result['point_history'][i, j])
+                updates.append((row[3], tier_before, point_before, tier_after, point_after,
+                                result['messages'][i][j], settled_at, user_ids[i], row[0]))
+                tier_before, point_before = tier_after, point_after
+        cursor.executemany("""
+            UPDATE tier_settlements
+            SET minutes = ?, tier_before = ?, point_before = ?, tier_after = ?, point_after = ?,
+                message = ?, settled_at = ?
+            WHERE user_id = ? AND day = ?
+        """, updates)
+        update_user_tiers(list(zip(result['rank'].tolist(), result['rank_point'].tolist(), user_ids)))
+    logger.info("정산 뒤 기록이 바뀐 %d명 다시 정산 (%s부터)",
+                len(user_ids), min(history[0][0] for history in histories))
+    return len(user_ids)
+
+def last_settleable_day(now=None):
+    """유예 시간이 지나 정산할 수 있는 가장 최근 날짜"""
+    now = now or datetime.now()
+    return (now - timedelta(hours=SETTLEMENT_GRACE_HOURS)).date() - timedelta(days=1)
+
+def settle_pending(now=None):
+    """정산 뒤 기록이 바뀐 날을 다시 정산하고, 마지막 정산일 다음 날부터 정산할 수 있는 날까지 밀린 정산 처리
+    return: {날짜 문자열: 정산한 사용자 수}
+    """
+    end = last_settleable_day(now)
+    earliest = end - timedelta(days=MAX_CATCH_UP_DAYS - 1)
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(day) FROM tier_settlements")
+        last = cursor.fetchone()[0]
+
+    start = date.fromisoformat(last) + timedelta(days=1) if last else end
+    if start < earliest:
+        logger.warning("정산하지 않은 %s ~ %s는 %d일보다 오래되어 건너뜁니다",
+                       start, earliest - timedelta(days=1), MAX_CATCH_UP_DAYS)
+        start = earliest
+
+    # 이전 날의 결과가 바뀌면 이후 정산의 시작 티어도 바뀌므로 먼저 처리
+    resettle_changed(earliest)
+
+    settled = {}
+    day = start
+    while day <= end:
+        settled[day.isoformat()] = settle_day(day)
+        day += timedelta(days=1)
+    return settled
+
+def _seconds_until_next_run(now=None):
+    """다음 날짜를 정산할 수 있게 되는 시각(+5초)까지 남은 시간, 최대 SCHEDULER_INTERVAL
+    (SCHEDULER_INTERVAL마다 깨어나 정산 뒤 바뀐 기록도 확인)
+    """
+    now = now or datetime.now()
+    next_day_end = datetime.combine(last_settleable_day(now) + timedelta(days=2), datetime.min.time())
+    next_run = next_day_end + timedelta(hours=SETTLEMENT_GRACE_HOURS, seconds=5)
+    return min(SCHEDULER_INTERVAL, max(1.0, (next_run - now).total_seconds()))
+
+def _scheduler_loop():
+    while True:
+        try:
+            settled = settle_pending()
+            if settled:
+                logger.info("티어 정산 완료: %s", settled)
+        except Exception:
+            logger.exception("티어 정산 실패")
+        time.sleep(_seconds_until_next_run())
+
+_scheduler_lock = threading.Lock()
+_scheduler_thread = None
+
+def start_scheduler():
+    """백그라운드 정산 스레드 시작 (프로세스당 한 번)"""
+    global _scheduler_thread
+    with _scheduler_lock:
+        if _scheduler_thread is None:
+            _scheduler_thread = threading.Thread(target=_scheduler_loop, name="tier-settlement", daemon=True)
+            _scheduler_thread.start()
+
+def main():
+    parser = argparse.ArgumentParser(description="일일 티어 정산")
+    parser.add_argument("--day", help="이 날짜(YYYY-MM-DD)만 정산 (생략 시 밀린 날짜 모두)")
+    args = parser.parse_args()
+
+    init_db()
+    if args.day:
+        print(f"{args.day}: {settle_day(date.fromisoformat(args.day))}명 정산")
+    else:
+        for day, count in settle_pending().items():
+            print(f"{day}: {count}명 정산")
+
+if __name__ == "__main__":
+    main()
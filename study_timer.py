@@ -1,29 +1,39 @@
 # study_timer.py
 
 import streamlit as st
+import os
 from datetime import datetime
-import time
+from functools import lru_cache
 from database import (
     start_study_session, 
     finish_study_session, 
     cancel_study_session,
     get_active_session,
-    get_today_total_study_time,
-    get_user_tier,
-    update_user_tier,
 )
-from tier_logic import update_tier_and_score, Tier
+from db_writer import write
+from instrumentation import instrument_namespace
 
-def play_tier_up_sound():
-    """티어 업 소리 재생"""
+TIER_UP_SOUND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tier_up.mp3")
+# 알림 창이 떠 있는 시간 (초, CSS 애니메이션)
+TIER_MESSAGE_SECONDS = 3
+
+@lru_cache(maxsize=1)
+def load_tier_up_sound():
+    """티어 업 소리 파일을 한 번만 읽어 메모리에 보관 (없으면 None)"""
     try:
-        import pygame
-        pygame.mixer.init()
-        pygame.mixer.music.load("tier_up.mp3")
-        pygame.mixer.music.play()
-        time.sleep(2)  # 소리가 끝날 때까지 대기
-    except:
+        with open(TIER_UP_SOUND, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def play_tier_up_sound():
+    """티어 업 소리를 브라우저에서 재생 (서버는 기다리지 않음)"""
+    audio = load_tier_up_sound()
+    if audio is None:
         st.error("티어 업 소리를 재생할 수 없습니다.")
+        return
+    # 같은 바이트는 같은 주소로 제공되므로 브라우저 캐시를 그대로 사용
+    st.audio(audio, format="audio/mpeg", autoplay=True)
 
 def render_study_timer():
     """공부 타이머 UI 렌더링"""
@@ -99,7 +109,7 @@ def render_timer_start():
 def start_new_session(subject):
     """새 공부 세션 시작"""
     start_time = datetime.now()
-    session_id = start_study_session(st.session_state.user_id, start_time, subject)
+    session_id = write(start_study_session, st.session_state.user_id, start_time, subject)
     
     # 세션 상태 저장
     st.session_state.session_id = session_id
@@ -110,63 +120,55 @@ def start_new_session(subject):
     st.rerun()
 
 def complete_study_session(end_time, subject, felt_minutes):
-    """공부 세션 완료 처리"""
+    """공부 세션 완료 처리 (티어 점수는 하루 단위 정산에서 반영)"""
     session_id = st.session_state.session_id
     
     # 세션 완료
-    duration_minutes = finish_study_session(session_id, st.session_state.user_id, end_time, subject, felt_minutes)
-    
-    # 오늘 총 공부 시간 계산
-    today_minutes = get_today_total_study_time(st.session_state.user_id)
-    
-    # 티어 업데이트 계산
-    new_rank, new_point, tier_name, msg = update_tier_and_score(
-        st.session_state.tier_index,
-        st.session_state.rank_point,
-        today_minutes
-    )
-    
-    # DB에 티어 정보 업데이트
-    update_user_tier(st.session_state.user_id, new_rank, new_point)
+    duration_minutes = write(finish_study_session, session_id, st.session_state.user_id, end_time, subject, felt_minutes)
     
     # 세션 상태 초기화
     clear_session_state()
     
-    # 세션 상태 업데이트
-    st.session_state.tier_index = new_rank
-    st.session_state.rank_point = new_point
-    
     # 메시지 표시
     success_msg = f"🎉 공부 완료! {duration_minutes}분 기록됨"
     if subject:
         success_msg += f" (과목: {subject})"
     
     st.success(success_msg)
-    if msg:
-
-        st.markdown(
-            f"""
-            <div style='position: fixed; top: 50%; left: 50%; transform: translate(-50%, -50%); 
-            background-color: rgb(25, 46, 67); padding: 20px; border-radius: 10px; 
-            box-shadow: 0 0 10px rgba(0,0,0,0.1); z-index: 1000;'>
-                <h4 style='margin: 0; color: rgb(199, 235, 255);'>🎉 {msg}</h4>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
-        time.sleep(2) 
-        # 티어가 올랐을 때만 풍선 효과와 소리 재생
-        if "티어 상승" in msg:
-            st.balloons()
-            play_tier_up_sound()
-    
     st.rerun()
 
+def show_tier_message(msg):
+    """티어 정산 결과 표시 (티어 상승 시 풍선 효과와 소리)"""
+    # 잠시 보였다가 사라지는 알림 (CSS 애니메이션이라 서버에서 기다리지 않음)
+    st.markdown(
+        f"""
+        <style>
+        @keyframes tier-message {{
+            0% {{ opacity: 0; }}
+            10% {{ opacity: 1; }}
+            80% {{ opacity: 1; }}
+            100% {{ opacity: 0; visibility: hidden; }}
+        }}
+        </style>
+        <div style='position: fixed; top: 50%; left: 50%; transform: translate(-50%, -50%); 
+        background-color: rgb(25, 46, 67); padding: 20px; border-radius: 10px; 
+        box-shadow: 0 0 10px rgba(0,0,0,0.1); z-index: 1000; pointer-events: none;
+        animation: tier-message {TIER_MESSAGE_SECONDS}s ease-in-out forwards;'>
+            <h4 style='margin: 0; color: rgb(199, 235, 255);'>🎉 {msg}</h4>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+    # 티어가 올랐을 때만 풍선 효과와 소리 재생
+    if "티어 상승" in msg:
+        st.balloons()
+        play_tier_up_sound()
+
 def cancel_current_session():
     """현재 세션 취소"""
     session_id = st.session_state.session_id
     
-    if cancel_study_session(session_id, st.session_state.user_id):
+    if write(cancel_study_session, session_id, st.session_state.user_id):
         clear_session_state()
         st.warning("⚠️ 타이머가 취소되었습니다.")
         st.rerun()
@@ -178,4 +180,7 @@ def clear_session_state():
     keys_to_clear = ['session_id', 'start_time', 'current_subject']
     for key in keys_to_clear:
         if key in st.session_state:
-            del st.session_state[key] 
\ No newline at end of file
+            del st.session_state[key] 
+
+# 측정이 켜져 있으면 화면 그리는 함수의 호출 시간 기록
+instrument_namespace(globals(), only_prefix="render_")
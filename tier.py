@@ -1,3 +1,7 @@
+import argparse
+import csv
+import json
+import sys
 import math
 Cutline_point=[0,   100,300,500,    700,1000,1300,  1600,2000,2400,     2800,3400,4000,     4600,5400,6200,     7000,8000,9000,     10000,  1000000000]
 Daily_required=[0,  0,10,20,    30,40,50,   60,80,100,  120,140,160,    180,210,240,    270,300,330,    360]
@@ -5,33 +9,120 @@ Maximum=[80,    100,100,100,    100,100,100,    100,100,100,    120,120,120,
 Minimum=[0,    -25,-25,-25,    -50,-50,-50,    -75,-75,-75,    -100,-100,-100,     -150,-150,-150,     -200,-200,-200,     -300]
 Avoid_fall=[True,   True,True,True,  True,True,True,    True,True,True,   True,False,False,  True,False,False,  False,False,False,  False]
 Tier=['루키',   '브론즈1','브론즈2','브론즈3',  '실버1','실버2','실버3',    '골드1','골드2','골드3',    '다이아1','다이아2','다이아3',  '크리스탈1','크리스탈2','크리스탈3',    '레전드1','레전드2','레전드3',  '얼티밋']
-Rank=int(input("티어: "))
-Rank_point=int(input("티어 점수: "))
-index=0
-while True:
-    index+=1
-    print(str(index)+"째 날")
-    Study_time=int(input("오늘 공부 시간(분): "))
-    if Study_time<0:
-        print("종료")
-        break
-    Change = max(Minimum[Rank], min(Maximum[Rank], (Study_time-Daily_required[Rank])))
-    if Rank_point+Change >= Cutline_point[Rank+1]:
-        Rank_point+=Change#DB update
-        Rank+=1 #DB update
-        print("티어가 상승했습니다:", Tier[Rank-1], "->", Tier[Rank], sep=" ")
-        print("점수가 상승했습니다:", Rank_point-Change, "->", Rank_point, "(", Change, ")", sep=" ")
-    elif Rank_point+Change < Cutline_point[Rank]:
-        if Avoid_fall[Rank]:
-            Change=Rank_point-Cutline_point[Rank]
-            Rank_point=Cutline_point[Rank] #DB update
-            print("티어 강등이 방지되었습니다:", Tier[Rank], sep=" ")
-            print("점수가 하락했습니다:", Rank_point-Change, "->", Rank_point, "(", Change, ")", sep=" ")
+
+def run_interactive():
+    """티어 계산기 (하루씩 직접 입력)"""
+    Rank=int(input("티어: "))
+    Rank_point=int(input("티어 점수: "))
+    index=0
+    while True:
+        index+=1
+        print(str(index)+"째 날")
+        Study_time=int(input("오늘 공부 시간(분): "))
+        if Study_time<0:
+            print("종료")
+            break
+        Change = max(Minimum[Rank], min(Maximum[Rank], (Study_time-Daily_required[Rank])))
+        if Rank_point+Change >= Cutline_point[Rank+1]:
+            Rank_point+=Change#DB update
+            Rank+=1 #DB update
+            print("티어가 상승했습니다:", Tier[Rank-1], "->", Tier[Rank], sep=" ")
+            print("점수가 상승했습니다:", Rank_point-Change, "->", Rank_point, "(", Change, ")", sep=" ")
+        elif Rank_point+Change < Cutline_point[Rank]:
+            if Avoid_fall[Rank]:
+                Change=Rank_point-Cutline_point[Rank]
+                Rank_point=Cutline_point[Rank] #DB update
+                print("티어 강등이 방지되었습니다:", Tier[Rank], sep=" ")
+                print("점수가 하락했습니다:", Rank_point-Change, "->", Rank_point, "(", Change, ")", sep=" ")
+            else:
+                Rank_point+=Change #DB update1
+                Rank-=1 #DB update
+                print("티어가 강등되었습니다:", Tier[Rank+1], "->", Tier[Rank], sep=" ")
+                print("점수가 하락했습니다:", Rank_point-Change, "->", Rank_point, "(", Change, ")", sep=" ")
         else:
-            Rank_point+=Change #DB update1
-            Rank-=1 #DB update
-            print("티어가 강등되었습니다:", Tier[Rank+1], "->", Tier[Rank], sep=" ")
-            print("점수가 하락했습니다:", Rank_point-Change, "->", Rank_point, "(", Change, ")", sep=" ")
+            Rank_point+=Change #DB update
+            print("점수가 변동되었습니다:", Rank_point-Change, "->", Rank_point, "(", Change, ")", sep=" ")
+
+def load_batch(path):
+    """CSV 또는 JSONL에서 사용자별 (user_id, 티어, 점수, 일별 공부 시간 목록) 읽기
+    CSV: user_id,rank,rank_point,이후 열은 일별 공부 시간 (빈 칸은 무시)
+    JSONL: {"user_id": ..., "rank": ..., "rank_point": ..., "minutes": [...]}
+    """
+    records = []
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    records.append((row["user_id"], int(row["rank"]), int(row["rank_point"]),
+                                    [int(m) for m in row["minutes"]]))
+        else:
+            for row in csv.reader(f):
+                if not row or row[0] == "user_id":
+                    continue
+                minutes = [int(m) for m in row[3:] if m.strip() != ""]
+                records.append((row[0], int(row[1]), int(row[2]), minutes))
+    return records
+
+def run_batch(input_path, output=None, params_path=None, trajectory=False, messages=False):
+    """파일로 받은 여러 사용자의 기록을 한 번에 계산해서 JSONL로 출력"""
+    import numpy as np
+    from tier_simulation import default_params, simulate_tiers
+
+    params = default_params()
+    if params_path:
+        with open(params_path, encoding="utf-8") as f:
+            params.update(json.load(f))
+
+    records = load_batch(input_path)
+    if not records:
+        return
+    n_days = max(len(r[3]) for r in records)
+    minutes = np.zeros((len(records), n_days), dtype=np.int64)
+    mask = np.zeros((len(records), n_days), dtype=bool)
+    for i, (_, _, _, days) in enumerate(records):
+        minutes[i, :len(days)] = days
+        mask[i, :len(days)] = True
+
+    result = simulate_tiers(
+        [r[1] for r in records], [r[2] for r in records], minutes,
+        mask=mask, params=params, record_trajectory=trajectory or messages, with_messages=messages
+    )
+
+    out = open(output, "w", encoding="utf-8") if output else sys.stdout
+    try:
+        for i, (user_id, _, _, days) in enumerate(records):
+            row = {
+                "user_id": user_id,
+                "rank": int(result["rank"][i]),
+                "tier": Tier[int(result["rank"][i])],
+                "rank_point": int(result["rank_point"][i])
+            }
+            if trajectory:
+                row["trajectory"] = [
+                    [int(result["rank_history"][i, d]), int(result["point_history"][i, d])]
+                    for d in range(len(days))
+                ]
+            if messages:
+                row["messages"] = result["messages"][i][:len(days)]
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+    finally:
+        if output:
+            out.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="티어 계산기")
+    parser.add_argument("--batch", metavar="FILE", help="CSV 또는 JSONL 파일을 한 번에 계산 (생략 시 대화형)")
+    parser.add_argument("--output", metavar="FILE", help="결과 JSONL 파일 (생략 시 표준 출력)")
+    parser.add_argument("--params", metavar="FILE", help="규칙표 JSON (Cutline_point, Daily_required, Maximum, Minimum, Avoid_fall)")
+    parser.add_argument("--trajectory", action="store_true", help="일별 (티어, 점수) 기록 포함")
+    parser.add_argument("--messages", action="store_true", help="일별 메시지 포함")
+    args = parser.parse_args()
+
+    if args.batch:
+        run_batch(args.batch, args.output, args.params, args.trajectory, args.messages)
     else:
-        Rank_point+=Change #DB update
-        print("점수가 변동되었습니다:", Rank_point-Change, "->", Rank_point, "(", Change, ")", sep=" ")
\ No newline at end of file
+        run_interactive()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# tier_simulation.py
+
+import numpy as np
+from tier_logic import (
+    Cutline_point,
+    Daily_required,
+    Maximum,
+    Minimum,
+    Avoid_fall,
+    Tier,
+)
+
+# 하루 결과 종류 (update_tier_and_score의 분기와 1:1 대응)
+KIND_CHANGE = 0   # 점수만 변동
+KIND_UP = 1       # 티어 상승
+KIND_GUARD = 2    # 티어 강등 방지
+KIND_DOWN = 3     # 티어 하락
+
+def default_params():
+    """tier_logic의 현재 규칙표 (튜닝 시 복사해서 수정)"""
+    return {
+        'Cutline_point': list(Cutline_point),
+        'Daily_required': list(Daily_required),
+        'Maximum': list(Maximum),
+        'Minimum': list(Minimum),
+        'Avoid_fall': list(Avoid_fall),
+    }
+
+def format_message(kind, rank, rank_point, change, tier_names=Tier):
+    """update_tier_and_score와 같은 메시지 생성 (rank/rank_point는 변경 후 값)"""
+    if kind == KIND_UP:
+        return f"✅ 티어 상승: {tier_names[rank - 1]} → {tier_names[rank]}\n점수: {rank_point - change} → {rank_point} (+{change})"
+    if kind == KIND_GUARD:
+        return f"⚠️ 티어 강등 방지: {tier_names[rank]} 유지\n점수: {rank_point - change} → {rank_point} ({change})"
+    if kind == KIND_DOWN:
+        return f"❌ 티어 하락: {tier_names[rank + 1]} → {tier_names[rank]}\n점수: {rank_point - change} → {rank_point} ({change})"
+    return f"ℹ️ 점수 변화: {rank_point - change} → {rank_point} ({change})"
+
+def simulate_tiers(ranks, rank_points, study_minutes, mask=None, params=None,
+                   record_trajectory=True, with_messages=False):
+    """
+    여러 사용자의 여러 날을 한 번에 계산 (update_tier_and_score를 날짜 순으로 반복한 것과 동일)
+    ranks, rank_points: (사용자 수,) 시작 티어 인덱스와 점수
+    study_minutes: (사용자 수 × 일 수) 일별 공부 시간(분)
+    mask: (사용자 수 × 일 수) bool, False인 날은 건너뜀 (기록 길이가 다른 경우), None이면 전부 계산
+    params: default_params() 형식의 규칙표, None이면 tier_logic 값 사용
+    return: {'rank', 'rank_point', 'rank_history', 'point_history', 'kinds', 'changes', 'messages'}
+    """
+    params = params or default_params()
+    cutline = np.asarray(params['Cutline_point'], dtype=np.int64)
+    required = np.asarray(params['Daily_required'], dtype=np.int64)
+    maximum = np.asarray(params['Maximum'], dtype=np.int64)
+    minimum = np.asarray(params['Minimum'], dtype=np.int64)
+    avoid_fall = np.asarray(params['Avoid_fall'], dtype=bool)
+
+    rank = np.array(ranks, dtype=np.int64)
+    point = np.array(rank_points, dtype=np.int64)
+    minutes = np.asarray(study_minutes, dtype=np.int64).reshape(len(rank), -1)
+    n_users, n_days = minutes.shape
+    if mask is None:
+        mask = np.ones((n_users, n_days), dtype=bool)
+    else:
+        mask = np.asarray(mask, dtype=bool).reshape(n_users, n_days)
+
+    rank_history = np.empty((n_users, n_days), dtype=np.int64) if record_trajectory else None
+    point_history = np.empty((n_users, n_days), dtype=np.int64) if record_trajectory else None
+    kinds = np.full((n_users, n_days), -1, dtype=np.int8)
+    changes = np.zeros((n_users, n_days), dtype=np.int64)
+
+    # 날짜는 순서대로, 사용자는 벡터로 처리
+    for day in range(n_days):
+        active = mask[:, day]
+        change = np.maximum(minimum[rank], np.minimum(maximum[rank], minutes[:, day] - required[rank]))
+        moved = point + change
+
+        # 상위 컷라인 돌파 / 하위 컷라인 미달 (강등 방지 여부)
+        up = moved >= cutline[rank + 1]
+        below = ~up & (moved < cutline[rank])
+        guard = below & avoid_fall[rank]
+        down = below & ~avoid_fall[rank]
+
+        # 강등 방지 시 점수는 컷라인으로, 메시지용 변화량은 (기존 점수 - 컷라인)
+        floor = cutline[rank]
+        shown_change = np.where(guard, point - floor, change)
+        new_point = np.where(guard, floor, moved)
+        new_rank = rank + up - down
+
+        rank = np.where(active, new_rank, rank)
+        point = np.where(active, new_point, point)
+
+        kind = np.select([up, guard, down], [KIND_UP, KIND_GUARD, KIND_DOWN], KIND_CHANGE)
+        kinds[:, day] = np.where(active, kind, -1)
+        changes[:, day] = np.where(active, shown_change, 0)
+        if record_trajectory:
+            rank_history[:, day] = rank
+            point_history[:, day] = point
+
+    messages = None
+    if with_messages:
+        messages = _build_messages(kinds, changes, rank_history, point_history, ranks, rank_points)
+
+    return {
+        'rank': rank,
+        'rank_point': point,
+        'rank_history': rank_history,
+        'point_history': point_history,
+        'kinds': kinds,
+        'changes': changes,
+        'messages': messages
+    }
+
+def _build_messages(kinds, changes, rank_history, point_history, ranks, rank_points):
+    """사용자별 일별 메시지 목록 (건너뛴 날은 None)"""
+    if rank_history is None:
+        raise ValueError("with_messages=True에는 record_trajectory=True가 필요합니다.")
+    messages = []
+    for user in range(kinds.shape[0]):
+        user_messages = []
+        for day in range(kinds.shape[1]):
+            kind = int(kinds[user, day])
+            if kind < 0:
+                user_messages.append(None)
+                continue
+            user_messages.append(format_message(
+                kind,
+                int(rank_history[user, day]),
+                int(point_history[user, day]),
+                int(changes[user, day])
+            ))
+        messages.append(user_messages)
+    return messages
@@ -1,10 +1,12 @@
 # utils.py
 
 import streamlit as st
-import os
-from tier_logic import Tier, update_tier_and_score
-from database import get_today_total_study_time
-TIER_IMAGE_DIR = "tier"
+from datetime import date, timedelta
+from tier_logic import Tier
+from database import get_latest_settlement
+from study_timer import show_tier_message
+from instrumentation import instrument_namespace
+from assets import tier_image, PROFILE_SIZE
 
 def get_tier_image_filename(tier_name):
     """
@@ -40,29 +42,35 @@ def render_user_info():
     current_tier_name = Tier[st.session_state.tier_index]
     st.success(f"✅ {st.session_state.username}님 안녕하세요! (티어: {current_tier_name}, 점수: {st.session_state.rank_point}점)")
     
-    # 티어 이미지
-    img_name = get_tier_image_filename(current_tier_name)
-    tier_img_file = os.path.join(TIER_IMAGE_DIR, img_name)
+    # 티어 이미지 (프로세스 캐시에 미리 줄여 둔 PNG 바이트, 같은 내용이면 같은 URL로 전달됨)
+    image = tier_image(get_tier_image_filename(current_tier_name), PROFILE_SIZE)
     
-    if os.path.exists(tier_img_file):
-        st.image(tier_img_file, width=80)
+    if image is not None:
+        st.image(image.data, width=PROFILE_SIZE)
     else:
         st.warning("⚠️ 티어 이미지 파일을 찾을 수 없습니다.")
 
-def update_daily_tier_progress():
-    """일일 티어 진행도 업데이트"""
-    if not st.session_state.today_flag:
-        # 오늘 공부 시간(분) 계산
-        today_minutes = get_today_total_study_time(st.session_state.user_id)
-        # update_tier_and_score 호출
-        rank, rank_point, tier_name, msg = update_tier_and_score(
-            st.session_state.tier_index,
-            st.session_state.rank_point,
-            today_minutes
-        )
-        # 세션 상태에 반영
-        st.session_state.tier_index = rank
-        st.session_state.rank_point = rank_point
-        st.session_state.today_flag = True
-        if msg:
-            st.info(msg) 
\ No newline at end of file
+def render_settlement_notice():
+    """가장 최근 일일 티어 정산 결과를 세션당 한 번 표시 (조회만 함)"""
+    # 정산은 state_version을 올리므로 날짜와 로그인 스냅샷의 버전이 그대로면 다시 조회하지 않음
+    snapshot = st.session_state.get('auth_snapshot')
+    checked = (date.today(), snapshot['version'] if snapshot else None)
+    if st.session_state.get('settlement_checked') == checked:
+        return
+    st.session_state.settlement_checked = checked
+
+    settlement = get_latest_settlement(st.session_state.user_id)
+    if not settlement or not settlement['message']:
+        return
+    # 어제 이전의 오래된 정산 결과는 다시 보여주지 않음
+    if settlement['day'] < (date.today() - timedelta(days=1)).isoformat():
+        return
+    # 같은 정산 결과는 브라우저 세션마다 한 번만 표시
+    if st.session_state.get('settlement_notice_day') == settlement['day']:
+        return
+    st.session_state.settlement_notice_day = settlement['day']
+    st.info(f"📅 {settlement['day']} 정산 (공부 {settlement['minutes']}분)")
+    show_tier_message(settlement['message'])
+
+# 측정이 켜져 있으면 화면 그리는 함수의 호출 시간 기록
+instrument_namespace(globals(), only_prefix="render_")